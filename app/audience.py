@@ -0,0 +1,269 @@
+# app/audience.py
+"""
+Audience overlap between pages, from a compact follower-set index.
+
+Every page's follower ids (SocialMediaUser.id) are kept as one sorted uint32
+array in page_follower_sets, rebuilt when its followers sync. Overlap queries
+decode those blobs and intersect them in memory instead of self-joining
+page_followers: one row per page instead of one per follow.
+
+    python -m app.audience     # build sets for pages that have none
+"""
+import asyncio
+import heapq
+import sys
+from array import array
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import models
+from .cache import TTLCache
+from .config import settings
+from .database import AsyncSessionLocal, dispose_engines, init_db
+
+_similar = TTLCache(
+    ttl_seconds=settings.AUDIENCE_SIMILAR_CACHE_SECONDS,
+    max_entries=1_000,
+    max_bytes=8 << 20,
+)
+
+
+def encode_ids(ids) -> bytes:
+    """
+    Sorted, de-duplicated ids as little-endian uint32s.
+    """
+    arr = array("I", sorted(set(ids)))
+    if sys.byteorder == "big":
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def decode_ids(blob: bytes) -> array:
+    arr = array("I")
+    arr.frombytes(blob)
+    if sys.byteorder == "big":
+        arr.byteswap()
+    return arr
+
+
+def overlap(a, b) -> Tuple[int, float]:
+    """
+    (shared ids, Jaccard similarity) of two id collections. Pass a set as
+    `a` when you have one: only `b` is iterated.
+    """
+    a_set = a if isinstance(a, (set, frozenset)) else set(a)
+    shared = len(a_set.intersection(b))
+    union = len(a) + len(b) - shared
+    return shared, (shared / union if union else 0.0)
+
+
+async def update_follower_set(db: AsyncSession, page_id: int):
+    """
+    Rebuild a page's follower set from page_followers (no commit).
+    """
+    res = await db.execute(
+        select(models.PageFollower.user_id).where(
+            models.PageFollower.page_id == page_id
+        )
+    )
+    blob = encode_ids(res.scalars())
+    values = {
+        "page_id": page_id,
+        "follower_count": len(blob) // 4,
+        "user_ids": blob,
+    }
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        stmt = postgresql.insert(models.PageFollowerSet)
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(models.PageFollowerSet)
+    else:
+        await _replace_follower_set(db, values)
+        return
+    stmt = stmt.values(**values)
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["page_id"],
+            set_={
+                "follower_count": stmt.excluded.follower_count,
+                "user_ids": stmt.excluded.user_ids,
+                "updated_at": func.now(),
+            },
+        )
+    )
+
+
+async def _replace_follower_set(db: AsyncSession, values: dict):
+    """
+    Select-then-insert for dialects without an upsert statement.
+    """
+    stmt = select(models.PageFollowerSet).where(
+        models.PageFollowerSet.page_id == values["page_id"]
+    )
+    follower_set = (await db.execute(stmt)).scalar_one_or_none()
+    if follower_set is None:
+        db.add(models.PageFollowerSet(**values))
+    else:
+        follower_set.follower_count = values["follower_count"]
+        follower_set.user_ids = values["user_ids"]
+        follower_set.updated_at = func.now()
+    await db.flush()
+
+
+async def _get_set(
+    db: AsyncSession, page_id: str
+) -> Optional[Tuple[int, array]]:
+    """
+    (pages.id, follower ids) for a slug, building the set on first use for
+    pages synced before the index existed. None if the page doesn't exist.
+    """
+    stmt = (
+        select(models.Page.id, models.PageFollowerSet.user_ids)
+        .outerjoin(models.PageFollowerSet)
+        .where(models.Page.linkedin_page_id == page_id)
+    )
+    row = (await db.execute(stmt)).first()
+    if row is None:
+        return None
+    pk, blob = row
+    if blob is None:
+        await update_follower_set(db, pk)
+        await db.commit()
+        res = await db.execute(
+            select(models.PageFollowerSet.user_ids).where(
+                models.PageFollowerSet.page_id == pk
+            )
+        )
+        blob = res.scalar_one()
+    return pk, decode_ids(blob)
+
+
+async def get_overlap(
+    db: AsyncSession, page_id: str, other_page_id: str
+) -> Optional[Dict[str, object]]:
+    """
+    Follower counts, shared followers and Jaccard similarity of two pages;
+    None if either page doesn't exist.
+    """
+    first = await _get_set(db, page_id)
+    second = await _get_set(db, other_page_id)
+    if first is None or second is None:
+        return None
+    ids, other_ids = first[1], second[1]
+    shared, jaccard = overlap(set(ids), other_ids)
+    return {
+        "page_id": page_id,
+        "other_page_id": other_page_id,
+        "followers": len(ids),
+        "other_followers": len(other_ids),
+        "shared_followers": shared,
+        "jaccard": jaccard,
+    }
+
+
+async def get_similar(
+    db: AsyncSession, page_id: str, limit: int, by: str = "jaccard"
+) -> Optional[Dict[str, object]]:
+    """
+    The `limit` pages whose audience overlaps `page_id` most, ranked by
+    Jaccard similarity or by shared follower count (`by`). None if the page
+    doesn't exist. Results are reused for AUDIENCE_SIMILAR_CACHE_SECONDS.
+
+    Scans every other follower set once (streamed, AUDIENCE_SCAN_CHUNK rows
+    at a time), skipping sets whose size alone rules them out of the top k.
+    """
+    key = f"{page_id}:{limit}:{by}"
+    cached = _similar.get(key)
+    if cached is not None:
+        return cached
+
+    found = await _get_set(db, page_id)
+    if found is None:
+        return None
+    pk, ids = found
+    target = set(ids)
+
+    # min-heap of (score, shared, slug, followers); heap[0] is the k-th best
+    heap: List[Tuple[float, int, str, int]] = []
+    stmt = (
+        select(
+            models.Page.linkedin_page_id,
+            models.PageFollowerSet.follower_count,
+            models.PageFollowerSet.user_ids,
+        )
+        .join(models.Page, models.Page.id == models.PageFollowerSet.page_id)
+        .where(
+            models.PageFollowerSet.page_id != pk,
+            models.PageFollowerSet.follower_count > 0,
+        )
+        .execution_options(yield_per=settings.AUDIENCE_SCAN_CHUNK)
+    )
+    result = await db.stream(stmt)
+    async for slug, count, blob in result:
+        # best case: the smaller audience is entirely shared
+        best_shared = min(count, len(target))
+        if by == "shared":
+            bound = float(best_shared)
+        else:
+            bound = best_shared / max(count, len(target)) if target else 0.0
+        if len(heap) == limit and bound <= heap[0][0]:
+            continue
+        shared, jaccard = overlap(target, decode_ids(blob))
+        if not shared:
+            continue
+        score = float(shared) if by == "shared" else jaccard
+        entry = (score, shared, slug, count)
+        if len(heap) < limit:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+
+    similar = [
+        {
+            "page_id": slug,
+            "followers": count,
+            "shared_followers": shared,
+            "jaccard": shared / (count + len(target) - shared),
+        }
+        for _, shared, slug, count in sorted(heap, reverse=True)
+    ]
+    data = {"page_id": page_id, "followers": len(target), "similar": similar}
+    _similar.set(key, data)
+    return data
+
+
+async def backfill_follower_sets(db: AsyncSession, batch_size: int = 500) -> int:
+    """
+    Build follower sets for every page that has none yet. Commits per batch;
+    returns the number of pages done.
+    """
+    done = 0
+    while True:
+        stmt = (
+            select(models.Page.id)
+            .outerjoin(models.PageFollowerSet)
+            .where(models.PageFollowerSet.id.is_(None))
+            .order_by(models.Page.id)
+            .limit(batch_size)
+        )
+        page_ids = (await db.execute(stmt)).scalars().all()
+        if not page_ids:
+            return done
+        for page_id in page_ids:
+            await update_follower_set(db, page_id)
+        await db.commit()
+        done += len(page_ids)
+
+
+async def _main():
+    await init_db()
+    async with AsyncSessionLocal() as db:
+        done = await backfill_follower_sets(db)
+        total = await db.scalar(select(func.count(models.PageFollowerSet.id)))
+    await dispose_engines()
+    print(f"built follower sets for {done} pages ({total} indexed)")
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -0,0 +1,567 @@
+# app/bench.py
+"""
+In-process load and latency benchmark.
+
+Seeds the database with synthetic pages (same shape as scrape_linkedin_page),
+then drives every endpoint concurrently through httpx.ASGITransport and
+reports throughput and p50/p95/p99 latency per endpoint.
+
+    DATABASE_URL=sqlite+aiosqlite:///./bench.db python -m app.bench \\
+        --pages 10000 --followers 1000 --requests 5000 --out bench.json
+    python -m app.bench --no-seed --baseline bench.json   # compare runs
+
+Seeding refuses to touch a database that already has pages; use a scratch
+DATABASE_URL. Scrapes (POST .../sync) are served by a synthetic backend, so
+no network is used. Exits 1 if --baseline is given and any endpoint's p95
+got slower by more than --tolerance.
+"""
+import argparse
+import asyncio
+import json
+import math
+import platform
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import httpx
+from sqlalchemy import func, insert, select, text
+from . import models, scraper
+from .audience import backfill_follower_sets
+from .config import settings
+from .database import AsyncSessionLocal, dispose_engines, engine, init_db
+from .insights import backfill_insights
+from .search import ensure_search_index
+
+INDUSTRIES = [
+    "Software",
+    "Financial Services",
+    "Hospital & Health Care",
+    "Retail",
+    "Manufacturing",
+    "Education",
+    "Marketing and Advertising",
+    "Logistics",
+]
+_WORDS = [
+    "data", "cloud", "platform", "analytics", "health", "retail", "labs",
+    "systems", "global", "digital", "energy", "robotics", "finance", "media",
+]
+# fixed, so re-scraping a seeded page yields identical data (see fingerprint.py)
+_EPOCH = datetime(2026, 1, 1)
+
+
+def page_slug(n: int) -> str:
+    return f"bench-{n:07d}"
+
+
+def _follower_indexes(n: int, followers: int, users: int) -> List[int]:
+    # a deterministic sample of the shared user pool, so audiences overlap
+    return random.Random(n).sample(range(users), min(followers, users))
+
+
+def synthetic_scrape(
+    n: int, posts: int, followers: int, users: int
+) -> Dict[str, Any]:
+    """
+    Synthetic page number `n` in the shape returned by scrape_linkedin_page.
+    """
+    rng = random.Random(n)
+    words = rng.sample(_WORDS, 3)
+    slug = page_slug(n)
+    page = {
+        "linkedin_page_id": slug,
+        "linkedin_platform_id": str(10_000_000 + n),
+        "name": " ".join(w.capitalize() for w in words[:2]) + f" {n}",
+        "url": f"https://www.linkedin.com/company/{slug}",
+        "profile_image_url": "https://example.com/profile.png",
+        "description": f"{words[0]} {words[1]} company focused on {words[2]}.",
+        "website": f"https://{slug}.example.com",
+        "industry": INDUSTRIES[n % len(INDUSTRIES)],
+        # long-tailed, like real follower counts
+        "follower_count": int(rng.paretovariate(1.2) * 100),
+        "headcount": rng.randint(1, 20_000),
+        "specialities": ",".join(w.capitalize() for w in words),
+    }
+    post_rows = [
+        {
+            "linkedin_post_id": f"{slug}-post-{i}",
+            "content_text": f"Update {i} from {page['name']}",
+            "media_url": None,
+            "like_count": rng.randint(0, 500),
+            "comment_count": rng.randint(0, 50),
+            "share_count": rng.randint(0, 20),
+            "posted_at": _EPOCH - timedelta(days=3 * i + n % 3),
+        }
+        for i in range(1, posts + 1)
+    ]
+    follower_rows = [
+        {
+            "linkedin_user_id": f"bench-user-{u}",
+            "name": f"Bench User {u}",
+            "headline": "Professional",
+        }
+        for u in _follower_indexes(n, followers, users)
+    ]
+    return {"page": page, "posts": post_rows, "followers": follower_rows}
+
+
+class SyntheticBackend:
+    """
+    Scraper backend serving synthetic_scrape for bench-NNNNNNN slugs.
+    """
+
+    def __init__(self, pages: int, posts: int, followers: int, users: int):
+        self.pages = pages
+        self.posts = posts
+        self.followers = followers
+        self.users = users
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def scrape(self, page_id: str) -> Dict[str, Any]:
+        prefix, _, number = page_id.partition("-")
+        if prefix != "bench" or not number.isdigit() or int(number) >= self.pages:
+            raise scraper.PageNotFound(page_id)
+        return synthetic_scrape(int(number), self.posts, self.followers, self.users)
+
+
+async def seed(
+    pages: int,
+    posts: int,
+    followers: int,
+    users: int,
+    chunk_size: int = 1000,
+) -> Dict[str, float]:
+    """
+    Bulk-insert the synthetic dataset into an empty database, then build the
+    derived tables (search index, insights, follower sets) the same way the
+    app does for pages synced before they existed. Returns timings.
+    """
+    await init_db()
+    async with AsyncSessionLocal() as db:
+        if await db.scalar(select(func.count(models.Page.id))):
+            raise RuntimeError(
+                "database already has pages; seed into an empty DATABASE_URL "
+                "or pass --no-seed"
+            )
+
+    timings = {}
+    started = time.perf_counter()
+    user_table = models.SocialMediaUser.__table__
+    for start in range(0, users, chunk_size * 10):
+        rows = [
+            {
+                "id": u + 1,
+                "linkedin_user_id": f"bench-user-{u}",
+                "name": f"Bench User {u}",
+                "headline": "Professional",
+            }
+            for u in range(start, min(users, start + chunk_size * 10))
+        ]
+        async with engine.begin() as conn:
+            await conn.execute(insert(user_table), rows)
+
+    post_id = follow_id = 0
+    follow_batch = chunk_size * 10
+    for start in range(0, pages, chunk_size):
+        page_rows, post_rows = [], []
+        for n in range(start, min(pages, start + chunk_size)):
+            data = synthetic_scrape(n, posts, 0, users)
+            page_rows.append({"id": n + 1, **data["page"]})
+            for post in data["posts"]:
+                post_id += 1
+                post_rows.append({"id": post_id, "page_id": n + 1, **post})
+        async with engine.begin() as conn:
+            await conn.execute(insert(models.Page.__table__), page_rows)
+            if post_rows:
+                await conn.execute(insert(models.Post.__table__), post_rows)
+            # followers are flushed every follow_batch rows rather than per
+            # chunk of pages: at 10^5 followers a page, a chunk's worth
+            # wouldn't fit in memory
+            follow_rows = []
+            for n in range(start, min(pages, start + chunk_size)):
+                for u in _follower_indexes(n, followers, users):
+                    follow_id += 1
+                    follow_rows.append(
+                        {"id": follow_id, "page_id": n + 1, "user_id": u + 1}
+                    )
+                    if len(follow_rows) >= follow_batch:
+                        await conn.execute(
+                            insert(models.PageFollower.__table__), follow_rows
+                        )
+                        follow_rows = []
+            if follow_rows:
+                await conn.execute(insert(models.PageFollower.__table__), follow_rows)
+        done = min(pages, start + chunk_size)
+        print(f"seeded {done}/{pages} pages", file=sys.stderr)
+    timings["rows_seconds"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    async with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            # ids were set explicitly; move the serial sequences past them
+            for table in ("pages", "posts", "social_media_users", "page_followers"):
+                await conn.execute(
+                    text(
+                        f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                        f"coalesce((SELECT max(id) FROM {table}), 1))"
+                    )
+                )
+        await ensure_search_index(conn)
+    async with AsyncSessionLocal() as db:
+        await backfill_insights(db)
+        await backfill_follower_sets(db)
+    timings["derived_seconds"] = time.perf_counter() - started
+    return timings
+
+
+# (method, url, JSON body or None)
+Request = Tuple[str, str, Optional[dict]]
+
+
+def _any_page(rng: random.Random, pages: int) -> str:
+    return page_slug(rng.randrange(pages))
+
+
+# (label, weight, builder); builders take a Random and the page count
+def _mix(jobs: List[int]) -> List[Tuple[str, int, Callable[..., Request]]]:
+    return [
+        (
+            "GET /pages/{page_id}",
+            30,
+            lambda rng, n: ("GET", f"/pages/{_any_page(rng, n)}", None),
+        ),
+        (
+            "GET /pages?industry=",
+            6,
+            lambda rng, n: (
+                "GET",
+                f"/pages?industry={rng.choice(INDUSTRIES)}&limit=20",
+                None,
+            ),
+        ),
+        (
+            "GET /pages?followersMin=&followersMax=",
+            6,
+            lambda rng, n: (
+                "GET",
+                "/pages?followersMin=200&followersMax=2000&sort=followers&count=none",
+                None,
+            ),
+        ),
+        (
+            "GET /pages?sort=engagement_rate",
+            4,
+            lambda rng, n: ("GET", "/pages?sort=engagement_rate&count=none", None),
+        ),
+        (
+            "GET /pages?q=",
+            6,
+            lambda rng, n: ("GET", f"/pages?q={rng.choice(_WORDS)}&count=none", None),
+        ),
+        (
+            "GET /pages/{page_id}/posts",
+            10,
+            lambda rng, n: ("GET", f"/pages/{_any_page(rng, n)}/posts", None),
+        ),
+        (
+            "GET /pages/{page_id}/followers",
+            10,
+            lambda rng, n: ("GET", f"/pages/{_any_page(rng, n)}/followers", None),
+        ),
+        (
+            "GET /pages/{page_id}/insights",
+            8,
+            lambda rng, n: ("GET", f"/pages/{_any_page(rng, n)}/insights", None),
+        ),
+        (
+            "GET /pages/{page_id}/audience/overlap/{other_page_id}",
+            4,
+            lambda rng, n: (
+                "GET",
+                f"/pages/{_any_page(rng, n)}/audience/overlap/{_any_page(rng, n)}",
+                None,
+            ),
+        ),
+        (
+            "GET /pages/{page_id}/audience/similar",
+            2,
+            lambda rng, n: (
+                "GET",
+                f"/pages/{_any_page(rng, n)}/audience/similar?limit=10",
+                None,
+            ),
+        ),
+        (
+            "POST /pages/{page_id}/sync",
+            4,
+            lambda rng, n: ("POST", f"/pages/{_any_page(rng, n)}/sync", None),
+        ),
+        (
+            "POST /pages/{page_id}/sync?async=true",
+            1,
+            lambda rng, n: (
+                "POST",
+                f"/pages/{_any_page(rng, n)}/sync?async=true",
+                None,
+            ),
+        ),
+        (
+            "GET /jobs/{job_id}",
+            2,
+            lambda rng, n: ("GET", f"/jobs/{rng.choice(jobs)}", None),
+        ),
+        (
+            "POST /pages/sync",
+            1,
+            lambda rng, n: (
+                "POST",
+                "/pages/sync",
+                {"page_ids": [_any_page(rng, n) for _ in range(5)]},
+            ),
+        ),
+        (
+            "GET /export/pages.ndjson",
+            1,
+            lambda rng, n: (
+                "GET",
+                f"/export/pages.ndjson?industry={rng.choice(INDUSTRIES)}"
+                "&followersMin=5000&include=posts",
+                None,
+            ),
+        ),
+        (
+            "GET /scheduler/status",
+            1,
+            lambda rng, n: ("GET", "/scheduler/status", None),
+        ),
+    ]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """
+    Nearest-rank percentile of already sorted values.
+    """
+    if not values:
+        return 0.0
+    return values[max(0, math.ceil(pct / 100 * len(values)) - 1)]
+
+
+def _summary(
+    latencies: List[float], errors: Dict[str, int], wall: float
+) -> Dict[str, Any]:
+    values = sorted(latencies)
+    ms = lambda seconds: round(seconds * 1000, 3)  # noqa: E731
+    return {
+        "requests": len(values),
+        "errors": sum(errors.values()),
+        # failed requests by status code ("error" if no response)
+        "error_statuses": dict(errors),
+        "throughput_rps": round(len(values) / wall, 1) if wall else 0.0,
+        "mean_ms": ms(sum(values) / len(values)) if values else 0.0,
+        "p50_ms": ms(percentile(values, 50)),
+        "p95_ms": ms(percentile(values, 95)),
+        "p99_ms": ms(percentile(values, 99)),
+        "max_ms": ms(values[-1]) if values else 0.0,
+    }
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    pages: int,
+    requests: int,
+    concurrency: int,
+    seed_value: int = 0,
+) -> Dict[str, Any]:
+    """
+    Send `requests` requests drawn from the endpoint mix, `concurrency` at a
+    time; returns per-endpoint and overall summaries.
+    """
+    rng = random.Random(seed_value)
+    # a few queued jobs for GET /jobs/{job_id} (no worker runs them)
+    jobs = []
+    for _ in range(5):
+        res = await client.post(f"/pages/{_any_page(rng, pages)}/sync?async=true")
+        jobs.append(res.json()["id"])
+
+    mix = _mix(jobs)
+    labels = [label for label, _, _ in mix]
+    weights = [weight for _, weight, _ in mix]
+    builders = {label: build for label, _, build in mix}
+    plan = [
+        (label, builders[label](rng, pages))
+        for label in rng.choices(labels, weights, k=requests)
+    ]
+
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    queue = iter(plan)
+
+    async def worker():
+        for label, (method, url, body) in queue:
+            started = time.perf_counter()
+            try:
+                res = await client.request(method, url, json=body)
+                status = str(res.status_code) if res.status_code >= 400 else None
+            except Exception:
+                status = "error"
+            latencies[label].append(time.perf_counter() - started)
+            if status:
+                errors[label][status] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+
+    endpoints = {
+        label: _summary(latencies[label], errors[label], wall)
+        for label in labels
+        if latencies[label]
+    }
+    every = [latency for values in latencies.values() for latency in values]
+    every_error: Dict[str, int] = defaultdict(int)
+    for statuses in errors.values():
+        for status, n in statuses.items():
+            every_error[status] += n
+    return {
+        "wall_seconds": round(wall, 3),
+        "overall": _summary(every, every_error, wall),
+        "endpoints": endpoints,
+    }
+
+
+def compare(
+    result: Dict[str, Any], baseline: Dict[str, Any], tolerance: float
+) -> List[str]:
+    """
+    Endpoints whose p95 regressed by more than `tolerance` (0.2 = 20%).
+    """
+    regressions = []
+    for label, current in result["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(label)
+        if not before or not before["p95_ms"]:
+            continue
+        change = current["p95_ms"] / before["p95_ms"] - 1
+        print(
+            f"{label:55} p95 {before['p95_ms']:9.2f} -> "
+            f"{current['p95_ms']:9.2f} ms ({change:+.0%})"
+        )
+        if change > tolerance:
+            regressions.append(label)
+    return regressions
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+def _print_table(result: Dict[str, Any]):
+    print(
+        f"{'endpoint':55} {'n':>6} {'err':>4} {'rps':>8} "
+        f"{'p50':>8} {'p95':>8} {'p99':>8}"
+    )
+    rows = list(result["endpoints"].items()) + [("overall", result["overall"])]
+    for label, s in rows:
+        print(
+            f"{label:55} {s['requests']:6} {s['errors']:4} {s['throughput_rps']:8} "
+            f"{s['p50_ms']:8} {s['p95_ms']:8} {s['p99_ms']:8}"
+        )
+
+
+async def _main(args) -> int:
+    scraper.scraper_engine.backend = SyntheticBackend(
+        args.pages, args.posts, args.followers, args.users
+    )
+    timings = {}
+    if args.seed:
+        timings = await seed(args.pages, args.posts, args.followers, args.users)
+    else:
+        await init_db()
+
+    from .main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", timeout=None
+    ) as client:
+        if args.warmup:
+            await run_load(
+                client, args.pages, args.warmup, args.concurrency, seed_value=1
+            )
+        result = await run_load(client, args.pages, args.requests, args.concurrency)
+    await scraper.scraper_engine.close()
+    await dispose_engines()
+
+    result = {
+        "meta": {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "database": engine.dialect.name,
+            "cache_backend": settings.CACHE_BACKEND,
+            "pages": args.pages,
+            "posts_per_page": args.posts,
+            "followers_per_page": args.followers,
+            "users": args.users,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "seed": timings,
+        },
+        **result,
+    }
+    _print_table(result)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"wrote {args.out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        if regressions:
+            print(f"p95 regressed: {', '.join(regressions)}", file=sys.stderr)
+            return 1
+    return 0
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.bench", description=__doc__)
+    parser.add_argument("--pages", type=int, default=1_000)
+    parser.add_argument("--posts", type=int, default=5, help="posts per page")
+    parser.add_argument(
+        "--followers", type=int, default=100, help="followers per page"
+    )
+    parser.add_argument("--users", type=int, default=None, help="user pool size")
+    parser.add_argument("--requests", type=int, default=2_000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--warmup", type=int, default=200, help="untimed requests")
+    parser.add_argument("--no-seed", dest="seed", action="store_false")
+    parser.add_argument("--out", help="write results as JSON")
+    parser.add_argument("--baseline", help="earlier results JSON to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+    if args.users is None:
+        args.users = max(10 * args.followers, 1_000)
+    args.users = max(args.users, args.followers)
+    return args
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(_parse_args())))
@@ -1,20 +1,732 @@
 # app/cache.py
-from typing import Any, Optional
+import asyncio
+import base64
+import gzip
+import hashlib
+import json
+import logging
+import os
+import random
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
 
-# Simple in-memory cache for development (no Redis required)
-_cache: dict[str, dict[str, Any]] = {}
+from . import metrics
+from .config import settings
 
+logger = logging.getLogger(__name__)
 
-async def get_cached_page(page_id: str) -> Optional[dict[str, Any]]:
+
+@dataclass(frozen=True)
+class CachedPage:
+    """
+    A page response as it goes on the wire: the JSON body, a gzipped copy
+    (large bodies only) and an ETag derived from the body. Cache hits are
+    written out as-is, with no validation or serialization.
+    """
+
+    body: bytes
+    etag: str
+    gzipped: Optional[bytes] = None
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + len(self.gzipped or b"")
+
+    def data(self) -> dict:
+        return json.loads(self.body)
+
+    def to_dict(self) -> dict:
+        gzipped = self.gzipped and base64.b64encode(self.gzipped).decode()
+        return {"body": self.body.decode(), "etag": self.etag, "gzip": gzipped}
+
+    @classmethod
+    def from_dict(cls, stored: dict) -> "CachedPage":
+        gzipped = stored.get("gzip")
+        return cls(
+            body=stored["body"].encode(),
+            etag=stored["etag"],
+            gzipped=base64.b64decode(gzipped) if gzipped else None,
+        )
+
+
+def json_default(value: Any):
+    # same datetime format pydantic / FastAPI responses use
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def encode_page(data: dict) -> CachedPage:
+    """
+    Encode page data once, the way FastAPI would have on every request.
+    """
+    body = json.dumps(
+        data, default=json_default, ensure_ascii=False, separators=(",", ":")
+    ).encode()
+    # weak: the gzipped copy is the same content under the same tag
+    etag = 'W/"%s"' % hashlib.sha256(body).hexdigest()[:32]
+    gzipped = None
+    if 0 <= settings.CACHE_GZIP_MIN_BYTES <= len(body):
+        gzipped = gzip.compress(body, compresslevel=6, mtime=0)
+    return CachedPage(body=body, etag=etag, gzipped=gzipped)
+
+
+def _approx_size(value: Any) -> int:
+    """
+    Rough byte size of a cached value (its JSON encoding).
+    """
+    if isinstance(value, CachedPage):
+        return value.size
+    return len(json.dumps(value, default=str))
+
+
+class TTLCache:
+    """
+    In-process cache with a per-entry TTL and LRU eviction.
+
+    Bounded both by entry count and by approximate total size in bytes;
+    whichever limit is hit first evicts the least recently used entries.
+    Expired entries are dropped lazily when they are looked up or reach
+    the LRU end.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float,
+        max_entries: int,
+        max_bytes: int,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._clock = clock
+        # key -> (expires_at, stored_at, size, value), least recently used first
+        self._entries: "OrderedDict[str, Tuple[float, float, int, Any]]" = (
+            OrderedDict()
+        )
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self.get_with_age(key)
+        return None if entry is None else entry[0]
+
+    def get_with_age(self, key: str) -> Optional[Tuple[Any, float]]:
+        """
+        Value and its age in seconds (time since it was set), or None.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, stored_at, _, value = entry
+        now = self._clock()
+        if expires_at <= now:
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value, now - stored_at
+
+    def set(
+        self,
+        key: str,
+        value: Any,
+        ttl_seconds: Optional[float] = None,
+        age: float = 0.0,
+    ):
+        """
+        Store a value for `ttl_seconds` from now; `age` back-dates the value
+        itself (e.g. data copied from another tier or loaded from the DB).
+        """
+        size = _approx_size(value)
+        if key in self._entries:
+            self._remove(key)
+        if size > self.max_bytes:
+            # would evict everything else and still not fit
+            return
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        now = self._clock()
+        self._entries[key] = (now + ttl, now - age, size, value)
+        self._bytes += size
+        self._evict()
+
+    def touch(self, key: str) -> bool:
+        """
+        Reset an entry's age (and expiry) without replacing its value.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return False
+        _, _, size, value = entry
+        now = self._clock()
+        self._entries[key] = (now + self.ttl_seconds, now, size, value)
+        self._entries.move_to_end(key)
+        return True
+
+    def invalidate(self, key: str) -> bool:
+        if key not in self._entries:
+            return False
+        self._remove(key)
+        return True
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def hottest(self, limit: int) -> List[Tuple[str, Any, float]]:
+        """
+        (key, value, age) of up to `limit` live entries, most recently used
+        first.
+        """
+        now = self._clock()
+        hot = []
+        for key in reversed(self._entries):
+            if len(hot) >= limit:
+                break
+            expires_at, stored_at, _, value = self._entries[key]
+            if expires_at > now:
+                hot.append((key, value, now - stored_at))
+        return hot
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def _remove(self, key: str):
+        _, _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def _evict(self):
+        now = self._clock()
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            key, (expires_at, _, _, _) = next(iter(self._entries.items()))
+            self._remove(key)
+            if expires_at <= now:
+                self.expirations += 1
+            else:
+                self.evictions += 1
+
+
+class MemoryBackend:
+    """
+    Single-process backend: just the TTL + LRU cache.
+    """
+
+    def __init__(self, cache: TTLCache):
+        self.l1 = cache
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        return self.l1.get_with_age(key)
+
+    async def set(self, key: str, value: Any, age: float = 0.0):
+        self.l1.set(key, value, ttl_seconds=self.l1.ttl_seconds - age, age=age)
+
+    def warm(self, key: str, value: Any, age: float) -> bool:
+        if age >= self.l1.ttl_seconds:
+            return False
+        self.l1.set(key, value, ttl_seconds=self.l1.ttl_seconds - age, age=age)
+        return True
+
+    async def touch(self, key: str) -> bool:
+        return self.l1.touch(key)
+
+    async def invalidate(self, key: str) -> bool:
+        return self.l1.invalidate(key)
+
+    def stats(self) -> Dict[str, int]:
+        return self.l1.stats()
+
+
+class InMemoryRedis:
+    """
+    Minimal stand-in for the part of the redis asyncio client TwoTierBackend
+    uses (get/set/delete/publish/pubsub). Backends sharing one instance behave
+    like workers sharing one Redis server; select it with REDIS_URL=memory://.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._data: Dict[str, Tuple[Optional[float], bytes]] = {}
+        self._subscribers: Dict[str, List["_InMemoryPubSub"]] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= self._clock():
+            del self._data[key]
+            return None
+        return value
+
+    async def set(self, key: str, value, ex: Optional[int] = None):
+        if isinstance(value, str):
+            value = value.encode()
+        expires_at = None if ex is None else self._clock() + ex
+        self._data[key] = (expires_at, value)
+        return True
+
+    async def delete(self, *keys: str) -> int:
+        return sum(self._data.pop(k, None) is not None for k in keys)
+
+    async def publish(self, channel: str, message) -> int:
+        if isinstance(message, str):
+            message = message.encode()
+        subscribers = self._subscribers.get(channel, [])
+        for sub in subscribers:
+            sub.queue.put_nowait(
+                {"type": "message", "channel": channel.encode(), "data": message}
+            )
+        return len(subscribers)
+
+    def pubsub(self) -> "_InMemoryPubSub":
+        return _InMemoryPubSub(self)
+
+    async def close(self):
+        pass
+
+
+class _InMemoryPubSub:
+    def __init__(self, redis: InMemoryRedis):
+        self._redis = redis
+        self._channels: List[str] = []
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    async def subscribe(self, *channels: str):
+        for channel in channels:
+            self._redis._subscribers.setdefault(channel, []).append(self)
+            self._channels.append(channel)
+
+    async def unsubscribe(self, *channels: str):
+        for channel in channels or list(self._channels):
+            subs = self._redis._subscribers.get(channel, [])
+            if self in subs:
+                subs.remove(self)
+            if channel in self._channels:
+                self._channels.remove(channel)
+
+    async def listen(self) -> AsyncIterator[dict]:
+        while True:
+            yield await self.queue.get()
+
+    async def aclose(self):
+        await self.unsubscribe()
+
+    close = aclose
+
+
+class TwoTierBackend:
+    """
+    Small in-process L1 in front of a shared Redis L2.
+
+    Reads try L1, then L2 (filling L1 on the way back). Writes go to both
+    and publish the key on a pub/sub channel; every other worker drops that
+    key from its L1 so its next read comes from the fresh L2 copy.
+    L1 entries also expire on their own after CACHE_L1_TTL_SECONDS, which
+    bounds staleness if an invalidation message is ever lost. If the
+    subscription breaks, L1 is dropped and the listener resubscribes with a
+    jittered, exponentially growing delay.
+    """
+
+    def __init__(
+        self,
+        l1: TTLCache,
+        redis,
+        ttl_seconds: int,
+        channel: str,
+        key_prefix: str = "page:",
+        resubscribe_base_seconds: float = 0.5,
+        resubscribe_max_seconds: float = 30.0,
+    ):
+        self.l1 = l1
+        self.redis = redis
+        self.ttl_seconds = ttl_seconds
+        self.channel = channel
+        self.key_prefix = key_prefix
+        self.resubscribe_base_seconds = resubscribe_base_seconds
+        self.resubscribe_max_seconds = resubscribe_max_seconds
+        # tags our own invalidations so we don't drop what we just wrote
+        self.origin = uuid.uuid4().hex
+        self.l2_hits = 0
+        self.l2_misses = 0
+        self.invalidations_received = 0
+        self.resubscribes = 0
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+
+    async def start(self):
+        await self._subscribe()
+        self._listener = asyncio.create_task(self._listen())
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+        if self._pubsub is not None:
+            await self._pubsub.unsubscribe(self.channel)
+            self._pubsub = None
+
+    async def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        entry = self.l1.get_with_age(key)
+        if entry is not None:
+            return entry
+        raw = await self.redis.get(self.key_prefix + key)
+        if raw is None:
+            self.l2_misses += 1
+            return None
+        self.l2_hits += 1
+        # L2 ages use wall-clock time so they are comparable across workers
+        stored = json.loads(raw)
+        age = max(0.0, time.time() - stored["stored_at"])
+        value = CachedPage.from_dict(stored["value"])
+        self.l1.set(key, value, age=age)
+        return value, age
+
+    async def set(self, key: str, value: Any, age: float = 0.0):
+        self.l1.set(key, value, age=age)
+        await self._write_l2(key, value, age)
+        await self._publish(key)
+
+    def warm(self, key: str, value: Any, age: float) -> bool:
+        # L1 only: Redis may hold something newer, and nothing changed
+        if age >= self.l1.ttl_seconds:
+            return False
+        self.l1.set(key, value, ttl_seconds=self.l1.ttl_seconds - age, age=age)
+        return True
+
+    async def touch(self, key: str) -> bool:
+        """
+        Restart the entry's TTL in both tiers: L1, and the Redis key, which is
+        rewritten with a fresh stored_at and expiry.
+        """
+        # same value, so other workers' L1 copies stay valid: no publish
+        entry = self.l1.get_with_age(key)
+        if entry is None:
+            raw = await self.redis.get(self.key_prefix + key)
+            if raw is None:
+                return False
+            entry = (CachedPage.from_dict(json.loads(raw)["value"]), 0.0)
+        self.l1.set(key, entry[0])
+        await self._write_l2(key, entry[0], 0.0)
+        return True
+
+    async def invalidate(self, key: str) -> bool:
+        in_l1 = self.l1.invalidate(key)
+        in_l2 = await self.redis.delete(self.key_prefix + key)
+        await self._publish(key)
+        return in_l1 or bool(in_l2)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            **self.l1.stats(),
+            "l2_hits": self.l2_hits,
+            "l2_misses": self.l2_misses,
+            "invalidations_received": self.invalidations_received,
+            "resubscribes": self.resubscribes,
+        }
+
+    async def _write_l2(self, key: str, value: CachedPage, age: float):
+        stored = {"stored_at": time.time() - age, "value": value.to_dict()}
+        await self.redis.set(
+            self.key_prefix + key,
+            json.dumps(stored),
+            ex=max(1, int(self.ttl_seconds - age)),
+        )
+
+    async def _publish(self, key: str):
+        await self.redis.publish(
+            self.channel, json.dumps({"key": key, "origin": self.origin})
+        )
+
+    async def _subscribe(self):
+        self._pubsub = self.redis.pubsub()
+        await self._pubsub.subscribe(self.channel)
+
+    async def _drop_subscription(self):
+        pubsub, self._pubsub = self._pubsub, None
+        if pubsub is None:
+            return
+        try:
+            await pubsub.aclose()
+        except Exception:
+            pass
+
+    async def _listen(self):
+        failures = 0
+        while True:
+            try:
+                if self._pubsub is None:
+                    await self._subscribe()
+                    self.resubscribes += 1
+                    # invalidations published while we were away are lost
+                    self.l1.clear()
+                async for message in self._pubsub.listen():
+                    failures = 0
+                    self._on_message(message)
+                raise ConnectionError("subscription ended")
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                failures += 1
+                delay = min(
+                    self.resubscribe_max_seconds,
+                    self.resubscribe_base_seconds * 2 ** (failures - 1),
+                )
+                delay *= random.uniform(0.5, 1.5)
+                logger.warning(
+                    "cache invalidation subscription failed, resubscribing "
+                    "in %.1fs",
+                    delay,
+                    exc_info=True,
+                )
+                await self._drop_subscription()
+                await asyncio.sleep(delay)
+
+    def _on_message(self, message: dict):
+        if message.get("type") != "message":
+            return
+        try:
+            data = json.loads(message["data"])
+        except (TypeError, ValueError):
+            return
+        if data.get("origin") == self.origin:
+            return
+        self.invalidations_received += 1
+        self.l1.invalidate(data.get("key"))
+
+
+_memory_redis: Optional[InMemoryRedis] = None
+
+
+def _redis_from_url(url: str):
+    global _memory_redis
+    if url.startswith("memory://"):
+        if _memory_redis is None:
+            _memory_redis = InMemoryRedis()
+        return _memory_redis
+    from redis import asyncio as aioredis
+
+    return aioredis.from_url(url)
+
+
+def _retention_seconds() -> int:
     """
-    Get cached data for a page_id.
-    Returns the stored dict or None if not present.
+    How long entries are kept. Past CACHE_TTL_SECONDS they are stale; with
+    stale-while-revalidate they may still be served up to SWR_MAX_STALE_SECONDS.
     """
-    return _cache.get(page_id)
+    if settings.SWR_ENABLED:
+        return max(settings.CACHE_TTL_SECONDS, settings.SWR_MAX_STALE_SECONDS)
+    return settings.CACHE_TTL_SECONDS
 
 
-async def set_cached_page(page_id: str, value: dict[str, Any]):
+def _make_backend():
+    if settings.CACHE_BACKEND == "redis":
+        l1_ttl = min(settings.CACHE_L1_TTL_SECONDS, settings.CACHE_TTL_SECONDS)
+        l1 = TTLCache(
+            ttl_seconds=l1_ttl,
+            max_entries=settings.CACHE_L1_MAX_ENTRIES,
+            max_bytes=settings.CACHE_MAX_BYTES,
+        )
+        return TwoTierBackend(
+            l1,
+            _redis_from_url(settings.REDIS_URL),
+            ttl_seconds=_retention_seconds(),
+            channel=settings.CACHE_INVALIDATION_CHANNEL,
+        )
+    return MemoryBackend(
+        TTLCache(
+            ttl_seconds=_retention_seconds(),
+            max_entries=settings.CACHE_MAX_ENTRIES,
+            max_bytes=settings.CACHE_MAX_BYTES,
+        )
+    )
+
+
+_backend = _make_backend()
+
+
+async def start_cache():
     """
-    Store page data for a page_id in the in-memory cache.
+    Start the backend (subscribes to invalidations for the Redis backend).
     """
-    _cache[page_id] = value
+    await _backend.start()
+
+
+async def stop_cache():
+    await _backend.close()
+
+
+async def get_cached_page_with_age(
+    page_id: str,
+) -> Optional[Tuple[CachedPage, float]]:
+    """
+    Get cached data for a page_id and its age in seconds, stale or not.
+    """
+    with metrics.timed("cache"):
+        return await _backend.get(page_id)
+
+
+async def set_cached_page(
+    page_id: str, value: dict[str, Any], age: float = 0.0
+) -> CachedPage:
+    """
+    Encode and store page data for a page_id, returning the encoded page.
+    `age` is how old the data already is (e.g. when it comes from the DB
+    rather than a fresh scrape).
+    """
+    with metrics.timed("serialize"):
+        page = encode_page(value)
+    with metrics.timed("cache"):
+        await _backend.set(page_id, page, age=age)
+    return page
+
+
+async def touch_cached_page(page_id: str) -> bool:
+    """
+    Mark a cached page as fresh again without rewriting it, e.g. after a
+    sync that found nothing changed. Returns False if it wasn't cached.
+    """
+    with metrics.timed("cache"):
+        return await _backend.touch(page_id)
+
+
+async def invalidate_cached_page(page_id: str) -> bool:
+    """
+    Drop a page from the cache (and from other workers' L1). Returns True if
+    it was cached.
+    """
+    return await _backend.invalidate(page_id)
+
+
+def save_snapshot(path: str, limit: int) -> int:
+    """
+    Write the `limit` most recently used pages to `path` (JSON, replaced
+    atomically) so the next process can start warm. Returns the number saved.
+    """
+    now = time.time()
+    entries = [
+        {"key": key, "stored_at": now - age, "value": value.to_dict()}
+        for key, value, age in _backend.l1.hottest(limit)
+    ]
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({"saved_at": now, "entries": entries}, f)
+    os.replace(tmp, path)
+    return len(entries)
+
+
+def load_snapshot(path: str) -> Tuple[int, List[str]]:
+    """
+    Warm the cache from a save_snapshot file. Returns how many pages were
+    loaded and the hot keys whose saved copy was too old to keep (for the
+    caller to reload from the DB). A missing or unreadable file loads nothing
+    and malformed entries are skipped: the snapshot must never stop startup.
+    """
+    try:
+        with open(path) as f:
+            snapshot = json.load(f)
+        entries = snapshot.get("entries", [])
+        if not isinstance(entries, list):
+            raise ValueError("entries is not a list")
+    except (OSError, ValueError, AttributeError) as e:
+        logger.warning("ignoring cache snapshot %s: %s", path, e)
+        return 0, []
+    now, loaded, expired, skipped = time.time(), 0, [], 0
+    # oldest use first, so the LRU order comes back as it was
+    for entry in reversed(entries):
+        try:
+            key = entry["key"]
+            age = max(0.0, now - float(entry["stored_at"]))
+            value = CachedPage.from_dict(entry["value"])
+        except (KeyError, TypeError, ValueError, AttributeError):
+            skipped += 1
+            continue
+        if _backend.warm(key, value, age):
+            loaded += 1
+        else:
+            expired.append(key)
+    if skipped:
+        logger.warning(
+            "skipped %d malformed entries in cache snapshot %s", skipped, path
+        )
+    expired.reverse()
+    return loaded, expired
+
+
+def cache_stats() -> Dict[str, int]:
+    """
+    Entry/byte usage and hit/miss/eviction counters of the page cache.
+    """
+    return _backend.stats()
+
+
+def _cache_counters(*names: str) -> Callable[[], Dict[Tuple[str, ...], float]]:
+    def collect():
+        stats = cache_stats()
+        return {(name,): stats[name] for name in names if name in stats}
+
+    return collect
+
+
+def _hit_ratio() -> Dict[Tuple[str, ...], float]:
+    stats = cache_stats()
+    lookups = stats["hits"] + stats["misses"]
+    return {(): stats["hits"] / lookups if lookups else 0.0}
+
+
+metrics.register(
+    metrics.Collected(
+        "page_cache_events_total",
+        "Page cache lookups and removals (L1; l2_* for the Redis tier).",
+        "counter",
+        _cache_counters(
+            "hits", "misses", "evictions", "expirations", "l2_hits", "l2_misses"
+        ),
+        labels=("event",),
+    )
+)
+metrics.register(
+    metrics.Collected(
+        "page_cache_usage",
+        "Entries and approximate bytes held by the page cache (L1).",
+        "gauge",
+        _cache_counters("entries", "bytes"),
+        labels=("unit",),
+    )
+)
+metrics.register(
+    metrics.Collected(
+        "page_cache_hit_ratio",
+        "Page cache hits / lookups since start (L1).",
+        "gauge",
+        _hit_ratio,
+    )
+)
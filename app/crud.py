@@ -1,10 +1,46 @@
 # app/crud.py
-from typing import Optional, Tuple, List
+import base64
+import json
+from datetime import datetime, timedelta, timezone
+from typing import (
+    Any,
+    AsyncIterator,
+    Collection,
+    Optional,
+    Tuple,
+    List,
+    Dict,
+    Iterable,
+    Iterator,
+    Sequence,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, delete
-from . import models
+from sqlalchemy import (
+    select,
+    func,
+    delete,
+    insert,
+    update,
+    and_,
+    or_,
+    text,
+    literal,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import contains_eager
+from . import models, schemas
+from .audience import update_follower_set
+from .cache import TTLCache
+from .config import settings
+from .fingerprint import fingerprint_scrape
+from .insights import update_insights
+from .search import apply_search, index_page
 from .schemas import PageListItem
 
+# Max number of bound parameters we put into a single statement.
+# SQLite builds before 3.32 cap this at 999; asyncpg at 32767.
+_MAX_PARAMS = 900
+
 
 async def get_page_by_slug(db: AsyncSession, page_id: str) -> Optional[models.Page]:
     stmt = select(models.Page).where(models.Page.linkedin_page_id == page_id)
@@ -12,13 +48,329 @@ async def get_page_by_slug(db: AsyncSession, page_id: str) -> Optional[models.Pa
     return result.scalar_one_or_none()
 
 
+def page_posts_stmt(page_pk: int, limit: Optional[int] = None):
+    """
+    select(Post) for one page, newest first (ix_posts_page_id_posted_at).
+    """
+    stmt = (
+        select(models.Post)
+        .where(models.Post.page_id == page_pk)
+        .order_by(models.Post.posted_at.desc().nullslast())
+    )
+    return stmt if limit is None else stmt.limit(limit)
+
+
+def page_followers_stmt(page_pk: int, limit: int):
+    """
+    select(SocialMediaUser) following one page
+    (ux_page_followers_page_id_user_id).
+    """
+    return (
+        select(models.SocialMediaUser)
+        .join(
+            models.PageFollower,
+            models.PageFollower.user_id == models.SocialMediaUser.id,
+        )
+        .where(models.PageFollower.page_id == page_pk)
+        .limit(limit)
+    )
+
+
+async def get_page_insight(
+    db: AsyncSession, page_id: str
+) -> Optional[Tuple[models.Page, Optional[models.PageInsight]]]:
+    """
+    (page, its insights or None) for a page slug, in one query; None if the
+    page doesn't exist.
+    """
+    stmt = (
+        select(models.Page, models.PageInsight)
+        .outerjoin(models.PageInsight)
+        .where(models.Page.linkedin_page_id == page_id)
+    )
+    row = (await db.execute(stmt)).first()
+    return tuple(row) if row else None
+
+
+async def build_page_data(db: AsyncSession, page: models.Page) -> dict:
+    """
+    Page details plus its posts (newest first) as a plain dict, ready to cache.
+    """
+    # explicitly load posts (avoid accessing page.posts lazily)
+    res = await db.execute(page_posts_stmt(page.id))
+    posts = res.scalars().all()
+
+    page_schema = schemas.Page(
+        id=page.id,
+        linkedin_page_id=page.linkedin_page_id,
+        linkedin_platform_id=page.linkedin_platform_id,
+        name=page.name,
+        url=page.url,
+        profile_image_url=page.profile_image_url,
+        description=page.description,
+        website=page.website,
+        industry=page.industry,
+        follower_count=page.follower_count,
+        headcount=page.headcount,
+        specialities=page.specialities,
+        posts=[schemas.Post.model_validate(p) for p in posts],
+    )
+    return page_schema.model_dump()
+
+
+def _chunks(items: Sequence, size: int) -> Iterator[Sequence]:
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+def _insert_ignore(db: AsyncSession, model, index_elements: List[str]):
+    """
+    Build an `INSERT ... ON CONFLICT DO NOTHING` for the session's dialect,
+    or None where there is no such statement (callers then add rows through
+    the ORM).
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(model).on_conflict_do_nothing(
+            index_elements=index_elements
+        )
+    if dialect == "sqlite":
+        return sqlite.insert(model).on_conflict_do_nothing(
+            index_elements=index_elements
+        )
+    return None
+
+
+def _normalize(value):
+    # DB drivers hand back aware datetimes on Postgres; scrapes are naive UTC
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _changed_fields(current: dict, wanted: dict) -> dict:
+    return {
+        k: v
+        for k, v in wanted.items()
+        if k in current and _normalize(current[k]) != _normalize(v)
+    }
+
+
+async def _load_users(
+    db: AsyncSession, linkedin_user_ids: Iterable[str], columns: Sequence
+) -> Dict[str, dict]:
+    """
+    Fetch SocialMediaUser rows keyed by linkedin_user_id using chunked IN queries.
+    Unknown ids are simply missing from the result.
+    """
+    ids = list(linkedin_user_ids)
+    found: Dict[str, dict] = {}
+    cols = [models.SocialMediaUser.id, models.SocialMediaUser.linkedin_user_id]
+    cols += [getattr(models.SocialMediaUser, c) for c in columns]
+    for chunk in _chunks(ids, _MAX_PARAMS):
+        stmt = select(*cols).where(
+            models.SocialMediaUser.linkedin_user_id.in_(chunk)
+        )
+        res = await db.execute(stmt)
+        found.update((row.linkedin_user_id, dict(row._mapping)) for row in res)
+    return found
+
+
+async def resolve_user_ids(
+    db: AsyncSession, linkedin_user_ids: Iterable[str]
+) -> Dict[str, int]:
+    """
+    Map linkedin_user_id -> SocialMediaUser.id using chunked IN queries.
+    """
+    users = await _load_users(db, linkedin_user_ids, [])
+    return {uid: row["id"] for uid, row in users.items()}
+
+
+async def upsert_users(
+    db: AsyncSession, by_user_id: Dict[str, dict]
+) -> Tuple[Dict[str, int], Dict[str, int]]:
+    """
+    Make sure every scraped user (keyed by linkedin_user_id) exists with the
+    scraped profile: update the ones whose profile changed and multi-row
+    insert the missing ones (ON CONFLICT DO NOTHING where the dialect has it,
+    so concurrent syncs don't collide). Returns linkedin_user_id ->
+    SocialMediaUser.id and row counts.
+    """
+    columns = sorted({k for f in by_user_id.values() for k in f})
+
+    existing = await _load_users(db, by_user_id.keys(), columns)
+    user_ids = {uid: row["id"] for uid, row in existing.items()}
+
+    changes = []
+    for uid, row in existing.items():
+        diff = _changed_fields(row, by_user_id[uid])
+        if diff:
+            changes.append({"id": row["id"], **diff})
+    if changes:
+        await db.execute(update(models.SocialMediaUser), changes)
+
+    missing = [f for uid, f in by_user_id.items() if uid not in user_ids]
+    users_inserted = 0
+    if missing:
+        rows = [{c: f.get(c) for c in columns} for f in missing]
+        stmt = _insert_ignore(db, models.SocialMediaUser, ["linkedin_user_id"])
+        if stmt is None:
+            # select-then-insert: the missing users were just looked up
+            users = [models.SocialMediaUser(**row) for row in rows]
+            db.add_all(users)
+            await db.flush()
+            user_ids.update((u.linkedin_user_id, u.id) for u in users)
+            users_inserted = len(users)
+        else:
+            for chunk in _chunks(rows, max(1, _MAX_PARAMS // len(columns))):
+                res = await db.execute(stmt.values(list(chunk)))
+                users_inserted += max(res.rowcount, 0)
+            user_ids.update(
+                await resolve_user_ids(db, [f["linkedin_user_id"] for f in missing])
+            )
+
+    return user_ids, {
+        "updated": len(changes),
+        "users_resolved": len(existing),
+        "users_inserted": users_inserted,
+    }
+
+
+async def sync_followers(
+    db: AsyncSession,
+    page_id: int,
+    followers_data: List[dict],
+) -> Dict[str, int]:
+    """
+    Reconcile a page's followers with the scraped list, keyed on linkedin_user_id.
+
+    Runs in a fixed number of round trips per chunk instead of one per follower:
+    upsert the users (see upsert_users), then add the new PageFollower links
+    with executemany and drop only the links that vanished.
+    Returns the number of rows each phase touched.
+    """
+    # last occurrence wins if the scrape repeats a user
+    by_user_id = {f["linkedin_user_id"]: f for f in followers_data}
+    user_ids, user_stats = await upsert_users(db, by_user_id)
+
+    res = await db.execute(
+        select(models.PageFollower.id, models.PageFollower.user_id).where(
+            models.PageFollower.page_id == page_id
+        )
+    )
+    wanted = set(user_ids.values())
+    linked = set()
+    stale = []
+    for link_id, user_id in res.tuples():
+        if user_id in wanted and user_id not in linked:
+            linked.add(user_id)
+        else:
+            stale.append(link_id)
+
+    links = [
+        {"page_id": page_id, "user_id": user_ids[uid]}
+        for uid in by_user_id
+        if user_ids[uid] not in linked
+    ]
+    if links:
+        await db.execute(insert(models.PageFollower), links)
+    for chunk in _chunks(stale, _MAX_PARAMS):
+        await db.execute(
+            delete(models.PageFollower).where(models.PageFollower.id.in_(chunk))
+        )
+
+    return {
+        "inserted": len(links),
+        "updated": user_stats["updated"],
+        "deleted": len(stale),
+        "users_resolved": user_stats["users_resolved"],
+        "users_inserted": user_stats["users_inserted"],
+    }
+
+
+async def sync_posts(
+    db: AsyncSession,
+    page_id: int,
+    posts_data: List[dict],
+) -> Dict[str, int]:
+    """
+    Reconcile a page's posts with the scraped list, keyed on linkedin_post_id.
+
+    Unchanged posts keep their ids (and their comments); changed posts are
+    updated in place and only posts missing from the scrape are deleted.
+    """
+    by_post_id = {p["linkedin_post_id"]: p for p in posts_data}
+
+    res = await db.execute(
+        select(*models.Post.__table__.columns).where(models.Post.page_id == page_id)
+    )
+    existing: Dict[str, dict] = {}
+    stale = []
+    for row in res.mappings():
+        post_id = row["linkedin_post_id"]
+        if post_id in by_post_id and post_id not in existing:
+            existing[post_id] = dict(row)
+        else:
+            stale.append(row["id"])
+
+    changes = []
+    for post_id, row in existing.items():
+        diff = _changed_fields(row, by_post_id[post_id])
+        if diff:
+            changes.append({"id": row["id"], **diff})
+    if changes:
+        await db.execute(update(models.Post), changes)
+
+    new = [
+        {"page_id": page_id, **p}
+        for post_id, p in by_post_id.items()
+        if post_id not in existing
+    ]
+    if new:
+        await db.execute(insert(models.Post), new)
+    for chunk in _chunks(stale, _MAX_PARAMS):
+        await db.execute(delete(models.Post).where(models.Post.id.in_(chunk)))
+
+    return {"inserted": len(new), "updated": len(changes), "deleted": len(stale)}
+
+
+async def get_fingerprints(
+    db: AsyncSession, page_id: int
+) -> Dict[str, models.PageFingerprint]:
+    stmt = select(models.PageFingerprint).where(
+        models.PageFingerprint.page_id == page_id
+    )
+    res = await db.execute(stmt)
+    return {fp.section: fp for fp in res.scalars()}
+
+
+def is_unchanged(stats: Dict[str, Dict[str, int]], *sections: str) -> bool:
+    """
+    True if the sync skipped every one of `sections` because its hash matched.
+    """
+    return all(stats.get(s, {}).get("skipped") for s in sections)
+
+
 async def create_or_update_page_from_scrape(
     db: AsyncSession,
     scraped: dict,
-) -> models.Page:
+    commit: bool = True,
+) -> Tuple[models.Page, Dict[str, Dict[str, int]]]:
+    """
+    Persist a scrape payload and return the page plus per-section row counts.
+
+    Each section (page fields, posts, followers) is fingerprinted; a section
+    whose hash matches the stored one is not written at all, only its
+    checked_at is bumped.
+    With commit=False the changes are only flushed so the caller can group
+    several pages into one transaction (and must refresh the page afterwards).
+    """
     page_data = scraped["page"]
     posts_data = scraped.get("posts", [])
     followers_data = scraped.get("followers", [])
+    hashes = fingerprint_scrape(scraped)
+
+    stats: Dict[str, Dict[str, int]] = {}
 
     # create or update Page
     page = await get_page_by_slug(db, page_data["linkedin_page_id"])
@@ -26,54 +378,317 @@ async def create_or_update_page_from_scrape(
         page = models.Page(**page_data)
         db.add(page)
         await db.flush()
+        await index_page(db, page)
+        fingerprints = {}
+        stats["page"] = {"inserted": 1}
     else:
-        for k, v in page_data.items():
-            setattr(page, k, v)
+        fingerprints = await get_fingerprints(db, page.id)
+        if _hash_matches(fingerprints, "page", hashes):
+            stats["page"] = {"skipped": 1}
+        else:
+            for k, v in page_data.items():
+                setattr(page, k, v)
+            await db.flush()
+            await index_page(db, page)
+            stats["page"] = {"updated": 1}
+
+    if _hash_matches(fingerprints, "posts", hashes):
+        stats["posts"] = {"skipped": 1}
+    else:
+        stats["posts"] = await sync_posts(db, page.id, posts_data)
+
+    if _hash_matches(fingerprints, "followers", hashes):
+        stats["followers"] = {"skipped": 1}
+    else:
+        stats["followers"] = await sync_followers(db, page.id, followers_data)
+        await update_follower_set(db, page.id)
+
+    if not is_unchanged(stats, "page", "posts"):
+        await update_insights(
+            db, page, posts_changed=not is_unchanged(stats, "posts")
+        )
+
+    for section, digest in hashes.items():
+        fp = fingerprints.get(section)
+        if fp is None:
+            db.add(
+                models.PageFingerprint(
+                    page_id=page.id, section=section, content_hash=digest
+                )
+            )
+            continue
+        if fp.content_hash != digest:
+            fp.content_hash = digest
+            fp.changed_at = func.now()
+        fp.checked_at = func.now()
+
+    if not commit:
         await db.flush()
+        return page, stats
 
-    # delete existing posts for this page (no lazy relationship access)
-    await db.execute(
-        delete(models.Post).where(models.Post.page_id == page.id)
+    await db.commit()
+    await db.refresh(page)
+    return page, stats
+
+
+def _age_seconds(last: Optional[datetime]) -> float:
+    if last is None:
+        return 0.0
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return max(0.0, (now - _normalize(last)).total_seconds())
+
+
+def checked_at_stmt(page_pk: int):
+    return select(models.PageFingerprint.checked_at).where(
+        models.PageFingerprint.page_id == page_pk,
+        models.PageFingerprint.section == "page",
+    )
+
+
+async def get_data_age(db: AsyncSession, page: models.Page) -> float:
+    """
+    Seconds since the page was last confirmed against LinkedIn (last sync,
+    whether or not it changed anything).
+    """
+    res = await db.execute(checked_at_stmt(page.id))
+    checked_at = res.scalar_one_or_none()
+    return _age_seconds(checked_at or page.updated_at or page.created_at)
+
+
+def _last_checked():
+    """
+    select(linkedin_page_id, last checked) for every page, "last checked"
+    being the fingerprint's checked_at, else updated_at.
+    """
+    checked = func.coalesce(
+        models.PageFingerprint.checked_at, models.Page.updated_at
+    )
+    stmt = select(models.Page.linkedin_page_id, checked).outerjoin(
+        models.PageFingerprint,
+        and_(
+            models.PageFingerprint.page_id == models.Page.id,
+            models.PageFingerprint.section == "page",
+        ),
+    )
+    return stmt
+
+
+def stalest_pages_stmt(limit: int):
+    """
+    The `limit` least recently checked pages, read off the (section,
+    checked_at) index of their "page" fingerprint.
+    """
+    fp = models.PageFingerprint
+    return (
+        select(models.Page.linkedin_page_id, fp.checked_at)
+        .join(fp, fp.page_id == models.Page.id)
+        .where(fp.section == "page")
+        .order_by(fp.checked_at.asc())
+        .limit(limit)
+    )
+
+
+async def get_stalest_pages(
+    db: AsyncSession, limit: int, skip: Collection[str] = ()
+) -> List[Tuple[str, float]]:
+    """
+    The `limit` least recently checked pages not in `skip`, as
+    (linkedin_page_id, age seconds). Reads limit + len(skip) rows, so pages
+    the caller skips (failing, already queued) never crowd the rest out.
+    Pages without a "page" fingerprint aren't seen until
+    add_missing_fingerprints has given them one.
+    """
+    res = await db.execute(stalest_pages_stmt(limit + len(skip)))
+    ages = [
+        (slug, _age_seconds(last))
+        for slug, last in res.tuples()
+        if slug not in skip
+    ]
+    return ages[:limit]
+
+
+async def add_missing_fingerprints(db: AsyncSession) -> int:
+    """
+    Give pages synced before fingerprints existed (or bulk-seeded) a "page"
+    fingerprint checked at their last update, so the stalest-first scan
+    sees them. Its hash matches no scrape: the next sync writes the page
+    as it would have without one. Returns how many were added.
+    """
+    fp = models.PageFingerprint
+    missing = (
+        select(
+            models.Page.id,
+            literal("page"),
+            literal(""),
+            func.coalesce(models.Page.updated_at, models.Page.created_at),
+        )
+        .where(
+            ~select(fp.id)
+            .where(fp.page_id == models.Page.id, fp.section == "page")
+            .exists()
+        )
     )
+    res = await db.execute(
+        insert(fp).from_select(
+            ["page_id", "section", "content_hash", "checked_at"], missing
+        )
+    )
+    return res.rowcount
+
+
+async def get_page_ages(
+    db: AsyncSession, page_ids: List[str]
+) -> List[Tuple[str, float]]:
+    """
+    (linkedin_page_id, age seconds) for the given pages that exist.
+    """
+    stmt = _last_checked()
+    ages = []
+    for chunk in _chunks(page_ids, _MAX_PARAMS):
+        res = await db.execute(
+            stmt.where(models.Page.linkedin_page_id.in_(chunk))
+        )
+        ages += [(slug, _age_seconds(last)) for slug, last in res.tuples()]
+    return ages
+
 
-    # insert posts
-    for p in posts_data:
-        post = models.Post(page_id=page.id, **p)
-        db.add(post)
+def _hash_matches(
+    fingerprints: Dict[str, models.PageFingerprint],
+    section: str,
+    hashes: Dict[str, str],
+) -> bool:
+    fp = fingerprints.get(section)
+    return fp is not None and fp.content_hash == hashes[section]
 
-    # delete existing followers for this page
+
+async def create_sync_job(db: AsyncSession, page_id: str) -> models.SyncJob:
+    """
+    Queue a sync of `page_id`, reusing a job that is still waiting for it.
+    """
+    stmt = select(models.SyncJob).where(
+        models.SyncJob.linkedin_page_id == page_id,
+        models.SyncJob.status == "queued",
+    )
+    job = (await db.execute(stmt.limit(1))).scalar_one_or_none()
+    if job:
+        return job
+    job = models.SyncJob(linkedin_page_id=page_id, status="queued", attempts=0)
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+    return job
+
+
+async def get_sync_job(db: AsyncSession, job_id: int) -> Optional[models.SyncJob]:
+    return await db.get(models.SyncJob, job_id)
+
+
+async def claim_sync_job(
+    db: AsyncSession,
+    worker_id: str,
+    lease_seconds: float = settings.JOB_LEASE_SECONDS,
+    max_attempts: int = settings.JOB_MAX_ATTEMPTS,
+) -> Optional[models.SyncJob]:
+    """
+    Atomically move the oldest claimable job to "running" for this worker.
+
+    A job is claimable while queued, or while running with a lease (its
+    started_at) older than `lease_seconds`: the worker that claimed it died.
+    Such a job is re-run until it has been claimed `max_attempts` times;
+    then it is marked failed instead.
+
+    On Postgres the row is locked with FOR UPDATE SKIP LOCKED, so concurrent
+    workers each get a different job without waiting on each other. SQLite has
+    no row locks but serializes writers, so a single compare-and-set UPDATE
+    (still claimable? then take it) gives the same guarantee.
+    """
+    job = models.SyncJob
+    expired = and_(
+        job.status == "running",
+        job.started_at < datetime.now(timezone.utc) - timedelta(seconds=lease_seconds),
+    )
     await db.execute(
-        delete(models.PageFollower).where(models.PageFollower.page_id == page.id)
+        update(job)
+        .where(expired, job.attempts >= max_attempts)
+        .values(
+            status="failed",
+            error=f"worker lease expired after {max_attempts} attempts",
+            finished_at=func.now(),
+        )
+        # the loaded objects' naive started_at can't be compared in Python
+        .execution_options(synchronize_session=False)
     )
 
-    # followers: create users and link
-    for f in followers_data:
-        stmt = select(models.SocialMediaUser).where(
-            models.SocialMediaUser.linkedin_user_id == f["linkedin_user_id"]
+    claimable = or_(job.status == "queued", expired)
+    running = {
+        "status": "running",
+        "worker_id": worker_id,
+        "attempts": job.attempts + 1,
+        "started_at": func.now(),
+    }
+    oldest = select(job.id).where(claimable).order_by(job.id).limit(1)
+
+    if db.get_bind().dialect.name == "postgresql":
+        job_id = (
+            await db.execute(oldest.with_for_update(skip_locked=True))
+        ).scalar_one_or_none()
+        if job_id is not None:
+            await db.execute(update(job).where(job.id == job_id).values(running))
+    else:
+        stmt = (
+            update(job)
+            .where(job.id == oldest.scalar_subquery(), claimable)
+            .values(running)
+            .returning(job.id)
+            .execution_options(synchronize_session=False)
         )
-        res = await db.execute(stmt)
-        user = res.scalar_one_or_none()
-        if not user:
-            user = models.SocialMediaUser(**f)
-            db.add(user)
-            await db.flush()
-        pf = models.PageFollower(page_id=page.id, user_id=user.id)
-        db.add(pf)
+        job_id = (await db.execute(stmt)).scalar_one_or_none()
 
+    # commits the expiries too
     await db.commit()
-    await db.refresh(page)
-    return page
+    if job_id is None:
+        return None
+    return await db.get(job, job_id, populate_existing=True)
 
 
-async def search_pages(
+async def finish_sync_job(
     db: AsyncSession,
+    job: models.SyncJob,
+    result: Optional[dict] = None,
+    error: Optional[str] = None,
+) -> models.SyncJob:
+    """
+    Record the outcome of a claimed job, unless its lease expired and
+    another attempt took it over (that attempt records its own).
+    """
+    await db.execute(
+        update(models.SyncJob)
+        .where(
+            models.SyncJob.id == job.id,
+            models.SyncJob.status == "running",
+            models.SyncJob.attempts == job.attempts,
+        )
+        .values(
+            status="failed" if error is not None else "succeeded",
+            result=json.dumps(result) if result is not None else None,
+            error=error,
+            finished_at=func.now(),
+        )
+    )
+    await db.commit()
+    await db.refresh(job)
+    return job
+
+
+def filter_pages_stmt(
     name: Optional[str],
     industry: Optional[str],
     followers_min: Optional[int],
     followers_max: Optional[int],
-    page: int,
-    limit: int,
-) -> Tuple[int, List[PageListItem]]:
+):
+    """
+    select(Page) with the GET /pages filters applied.
+    """
     stmt = select(models.Page)
     if name:
         stmt = stmt.where(models.Page.name.ilike(f"%{name}%"))
@@ -83,13 +698,273 @@ async def search_pages(
         stmt = stmt.where(models.Page.follower_count >= followers_min)
     if followers_max is not None:
         stmt = stmt.where(models.Page.follower_count <= followers_max)
+    return stmt
+
+
+# sort name -> (column or None for plain id order, descending)
+# ties (and the id sort itself) are broken by Page.id in the same direction;
+# "relevance" (search rank, only with q=) is handled in search_pages.
+# PageInsight columns are joined in by search_pages.
+PAGE_SORTS = {
+    "id": (None, False),
+    "followers": (models.Page.follower_count, True),
+    "name": (models.Page.name, False),
+    "engagement_rate": (models.PageInsight.engagement_rate, True),
+    "avg_engagement": (models.PageInsight.avg_engagement, True),
+    "total_engagement": (models.PageInsight.total_engagement, True),
+    "posts_per_week": (models.PageInsight.posts_per_week, True),
+}
+
+
+def _sorts_by_insight(sort: str) -> bool:
+    column, _ = PAGE_SORTS.get(sort, (None, False))
+    return column is not None and column.class_ is models.PageInsight
+
+
+# filters -> exact total, for count="cached" / "estimate"
+_page_counts = TTLCache(
+    ttl_seconds=settings.PAGES_COUNT_CACHE_SECONDS,
+    max_entries=1_000,
+    max_bytes=1 << 20,
+)
+
+
+def encode_cursor(sort: str, value, page_id: int) -> str:
+    raw = json.dumps([sort, value, page_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(sort: str, cursor: str) -> Tuple[object, int]:
+    """
+    (sort value, page id) of the last row the client saw.
+    Raises ValueError if the cursor is malformed or from another sort order.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, value, page_id = json.loads(raw)
+    except (ValueError, TypeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+    if cursor_sort != sort or not isinstance(page_id, int):
+        raise ValueError("Cursor does not match the requested sort")
+    return value, page_id
+
+
+def _after_cursor(sort: str, value, page_id: int):
+    """
+    WHERE clause selecting the rows that come after (value, page_id) in `sort`
+    order. NULL sort values come last in both directions.
+    """
+    column, descending = PAGE_SORTS[sort]
+    if descending:
+        id_after = models.Page.id < page_id
+    else:
+        id_after = models.Page.id > page_id
+    if column is None:
+        return id_after
+    if value is None:
+        return and_(column.is_(None), id_after)
+    beyond = column < value if descending else column > value
+    return or_(beyond, and_(column == value, id_after), column.is_(None))
+
+
+def _order_by(sort: str) -> list:
+    column, descending = PAGE_SORTS[sort]
+    id_order = models.Page.id.desc() if descending else models.Page.id.asc()
+    if column is None:
+        return [id_order]
+    order = column.desc() if descending else column.asc()
+    # NULLS LAST on a NOT NULL column only stops SQLite using the index order
+    if column.nullable:
+        order = order.nullslast()
+    return [order, id_order]
+
+
+async def count_pages(
+    db: AsyncSession, stmt, filters: tuple, mode: str
+) -> Optional[int]:
+    """
+    Total rows of a filtered page query.
+
+    exact:    count(*) every time
+    cached:   exact count, reused for PAGES_COUNT_CACHE_SECONDS per filter set
+    estimate: planner/rowid estimate when there are no filters, else cached
+    none:     skip counting
+    """
+    if mode == "none":
+        return None
+    if mode == "estimate" and not any(f is not None for f in filters):
+        estimate = await _estimate_page_count(db)
+        if estimate is not None:
+            return estimate
+    if mode in ("cached", "estimate"):
+        total = _page_counts.get(repr(filters))
+        if total is not None:
+            return total
 
     count_stmt = select(func.count()).select_from(stmt.subquery())
     total = (await db.execute(count_stmt)).scalar_one()
+    _page_counts.set(repr(filters), total)
+    return total
 
-    stmt = stmt.offset((page - 1) * limit).limit(limit)
-    res = await db.execute(stmt)
+
+async def _estimate_page_count(db: AsyncSession) -> Optional[int]:
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        stmt = text(
+            "SELECT reltuples::bigint FROM pg_class WHERE relname = 'pages'"
+        )
+        estimate = (await db.execute(stmt)).scalar_one_or_none()
+        # -1 / 0 until the table has been analyzed
+        return estimate if estimate and estimate > 0 else None
+    if dialect == "sqlite":
+        # ids are never reused, so max(id) bounds the row count from above
+        # and is a single index lookup
+        res = await db.execute(select(func.max(models.Page.id)))
+        return res.scalar_one() or 0
+    return None
+
+
+async def search_pages(
+    db: AsyncSession,
+    name: Optional[str],
+    industry: Optional[str],
+    followers_min: Optional[int],
+    followers_max: Optional[int],
+    page: int,
+    limit: int,
+    sort: Optional[str] = None,
+    cursor: Optional[str] = None,
+    count: str = "exact",
+    q: Optional[str] = None,
+) -> Tuple[Optional[int], List[PageListItem], Optional[str]]:
+    """
+    Filtered, sorted page listing.
+
+    Without a cursor this is classic offset pagination (`page`). With a
+    cursor (the `next_cursor` of the previous call) it seeks past the last
+    row seen instead, which costs the same on every page. `q` runs an
+    indexed full-text search (see app/search.py); its results are sorted by
+    relevance unless another sort is asked for. Returns
+    (total or None, items, next_cursor or None when there are no more rows).
+    """
+    sort = sort or ("relevance" if q else "id")
+    if sort == "relevance" and not q:
+        raise ValueError("sort=relevance needs q=")
+    if sort == "relevance" and cursor:
+        raise ValueError("Relevance-sorted results only support page=")
+
+    filters = (name, industry, followers_min, followers_max, q)
+    stmt = filter_pages_stmt(*filters[:4])
+    if q:
+        stmt, rank = apply_search(db, stmt, q)
+    total = await count_pages(db, stmt, filters, count)
+
+    if sort == "relevance":
+        ranked = [rank.desc()] if rank is not None else []
+        stmt = stmt.order_by(*ranked, models.Page.id.asc())
+    else:
+        if _sorts_by_insight(sort):
+            # pages that were never synced have no insights and sort last
+            stmt = stmt.outerjoin(models.PageInsight).options(
+                contains_eager(models.Page.insight)
+            )
+        stmt = stmt.order_by(*_order_by(sort))
+    if cursor:
+        stmt = stmt.where(_after_cursor(sort, *decode_cursor(sort, cursor)))
+    else:
+        stmt = stmt.offset((page - 1) * limit)
+    # one extra row tells us whether there is a next page
+    res = await db.execute(stmt.limit(limit + 1))
     items = res.scalars().all()
+    has_more = len(items) > limit
+    items = items[:limit]
+
+    next_cursor = None
+    if has_more and sort != "relevance":
+        last = items[-1]
+        column, _ = PAGE_SORTS[sort]
+        source = last.insight if _sorts_by_insight(sort) else last
+        value = None
+        if column is not None and source is not None:
+            value = getattr(source, column.key)
+        next_cursor = encode_cursor(sort, value, last.id)
 
     data = [PageListItem.model_validate(i) for i in items]
-    return total, data
+    return total, data, next_cursor
+
+
+async def _posts_by_page(db: AsyncSession, page_ids: List[int]) -> Dict[int, list]:
+    post = models.Post
+    stmt = (
+        select(*post.__table__.columns)
+        .where(post.page_id.in_(page_ids))
+        .order_by(post.page_id, post.posted_at.desc().nullslast(), post.id)
+    )
+    grouped: Dict[int, list] = {pid: [] for pid in page_ids}
+    for row in (await db.execute(stmt)).mappings():
+        record = dict(row)
+        grouped[record.pop("page_id")].append(record)
+    return grouped
+
+
+async def _followers_by_page(
+    db: AsyncSession, page_ids: List[int]
+) -> Dict[int, list]:
+    user = models.SocialMediaUser
+    stmt = (
+        select(models.PageFollower.page_id, *user.__table__.columns)
+        .join(user, user.id == models.PageFollower.user_id)
+        .where(models.PageFollower.page_id.in_(page_ids))
+        .order_by(models.PageFollower.page_id, user.id)
+    )
+    grouped: Dict[int, list] = {pid: [] for pid in page_ids}
+    for row in (await db.execute(stmt)).mappings():
+        record = dict(row)
+        grouped[record.pop("page_id")].append(record)
+    return grouped
+
+
+async def export_pages(
+    pages_db: AsyncSession,
+    related_db: AsyncSession,
+    name: Optional[str],
+    industry: Optional[str],
+    followers_min: Optional[int],
+    followers_max: Optional[int],
+    q: Optional[str] = None,
+    posts: bool = True,
+    followers: bool = True,
+    chunk_size: int = 500,
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Every page matching the GET /pages filters, in id order, as plain dicts
+    with their posts and followers embedded; yielded `chunk_size` at a time.
+
+    Pages are read through a server-side cursor on `pages_db`, while each
+    chunk's posts and followers are loaded in two IN queries on
+    `related_db` (a second connection, so the cursor is never interrupted).
+    Memory use is bounded by one chunk whatever the export size.
+    """
+    chunk_size = min(chunk_size, _MAX_PARAMS)
+    stmt = filter_pages_stmt(name, industry, followers_min, followers_max)
+    if q:
+        stmt, _ = apply_search(pages_db, stmt, q)
+    stmt = (
+        stmt.with_only_columns(*models.Page.__table__.columns)
+        .order_by(models.Page.id)
+        .execution_options(yield_per=chunk_size)
+    )
+
+    result = await pages_db.stream(stmt)
+    async for partition in result.mappings().partitions(chunk_size):
+        records = [dict(row) for row in partition]
+        page_ids = [r["id"] for r in records]
+        if posts:
+            by_page = await _posts_by_page(related_db, page_ids)
+            for record in records:
+                record["posts"] = by_page[record["id"]]
+        if followers:
+            by_page = await _followers_by_page(related_db, page_ids)
+            for record in records:
+                record["followers"] = by_page[record["id"]]
+        yield records
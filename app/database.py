@@ -1,15 +1,52 @@
 # app/database.py
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from . import metrics
 from .config import settings
 
 Base = declarative_base()
 
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=True,
-    future=True,
-)
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+    cursor.close()
+
+
+def make_engine(url: str) -> AsyncEngine:
+    """
+    Async engine with the configured pool settings (and pragmas on SQLite).
+    """
+    pool = {}
+    # SQLite keeps SQLAlchemy's default (no pooling for aiosqlite: each
+    # pooled connection would hold a live thread)
+    if make_url(url).get_backend_name() != "sqlite":
+        pool = dict(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+            pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+        )
+    new_engine = create_async_engine(url, echo=settings.DB_ECHO, future=True, **pool)
+    if new_engine.dialect.name == "sqlite":
+        event.listen(new_engine.sync_engine, "connect", _set_sqlite_pragmas)
+    return new_engine
+
+
+# writes (syncs, jobs, migrations) go to the primary
+engine = make_engine(settings.DATABASE_URL)
+# read-only endpoints get their own pool, so they never queue behind scrape
+# writes; with DATABASE_READ_URL set it points at a replica
+read_engine = make_engine(settings.DATABASE_READ_URL or settings.DATABASE_URL)
+if settings.METRICS_ENABLED:
+    metrics.instrument_engine(engine, "write")
+    metrics.instrument_engine(read_engine, "read")
 
 AsyncSessionLocal = sessionmaker(
     bind=engine,
@@ -19,7 +56,30 @@ AsyncSessionLocal = sessionmaker(
     autocommit=False,
 )
 
+AsyncReadSessionLocal = sessionmaker(
+    bind=read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+    autoflush=False,
+    autocommit=False,
+)
+
+
+async def init_db(create_schema: bool = True):
+    """
+    Create missing tables and the search index. With create_schema=False
+    (schema managed by `alembic upgrade head`) only look the index up.
+    """
+    from .search import detect_search_index, ensure_search_index
 
-async def init_db():
     async with engine.begin() as conn:
+        if not create_schema:
+            await detect_search_index(conn)
+            return
         await conn.run_sync(Base.metadata.create_all)
+        await ensure_search_index(conn)
+
+
+async def dispose_engines():
+    await engine.dispose()
+    await read_engine.dispose()
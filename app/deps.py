@@ -2,9 +2,17 @@
 from typing import AsyncGenerator
 from fastapi import Depends
 from sqlalchemy.ext.asyncio import AsyncSession
-from .database import AsyncSessionLocal
+from .database import AsyncReadSessionLocal, AsyncSessionLocal
 
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async with AsyncSessionLocal() as session:
         yield session
+
+
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Session on the read pool (or replica) for endpoints that only read.
+    """
+    async with AsyncReadSessionLocal() as session:
+        yield session
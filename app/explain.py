@@ -0,0 +1,178 @@
+# app/explain.py
+"""
+EXPLAIN the queries behind the hot endpoints and fail on full table scans.
+
+    python -m app.explain            # against settings.DATABASE_URL
+    DATABASE_URL=... python -m app.explain
+
+Runs `alembic upgrade head` on the database first, so the plans use the
+indexes the migrations create rather than create_all's. Prints every plan
+and exits 1 if any query scans a whole table instead of using an index
+(SQLite: a bare "SCAN <table>"; Postgres: a "Seq Scan", with enable_seqscan
+off so small dev tables don't hide a missing index).
+Run it when touching a query, an index or a migration.
+"""
+import asyncio
+import json
+import sys
+from pathlib import Path
+from typing import List, Tuple
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import crud, models
+from .database import AsyncSessionLocal, dispose_engines, init_db
+from .search import apply_search
+
+
+def hot_queries(db: AsyncSession) -> List[Tuple[str, object]]:
+    """
+    (label, statement) for every query that should be index-backed.
+    Unfiltered listings (GET /pages with no filters) are expected to scan
+    and are left out.
+    """
+    page_pk, limit = 1, 10
+    queries = [
+        (
+            "GET /pages/{page_id}: page by slug",
+            select(models.Page).where(models.Page.linkedin_page_id == "x"),
+        ),
+        ("GET /pages/{page_id}: posts", crud.page_posts_stmt(page_pk)),
+        ("GET /pages/{page_id}: data age", crud.checked_at_stmt(page_pk)),
+        ("GET /pages/{page_id}/posts", crud.page_posts_stmt(page_pk, limit)),
+        (
+            "GET /pages/{page_id}/followers",
+            crud.page_followers_stmt(page_pk, limit),
+        ),
+        (
+            "GET /pages/{page_id}/insights",
+            select(models.Page, models.PageInsight)
+            .outerjoin(models.PageInsight)
+            .where(models.Page.linkedin_page_id == "x"),
+        ),
+        ("GET /jobs/{job_id}", select(models.SyncJob).where(models.SyncJob.id == 1)),
+        ("scheduler: stalest pages", crud.stalest_pages_stmt(limit)),
+        (
+            "sync: existing followers",
+            select(models.PageFollower.user_id).where(
+                models.PageFollower.page_id == page_pk
+            ),
+        ),
+    ]
+
+    listings = [
+        ("industry=", dict(industry="Software"), "id"),
+        (
+            "followersMin=&followersMax=",
+            dict(followers_min=10, followers_max=99),
+            "followers",
+        ),
+        ("sort=followers", {}, "followers"),
+        ("sort=name", {}, "name"),
+    ]
+    for label, filters, sort in listings:
+        stmt = crud.filter_pages_stmt(
+            None,
+            filters.get("industry"),
+            filters.get("followers_min"),
+            filters.get("followers_max"),
+        )
+        queries.append(
+            (f"GET /pages?{label}", stmt.order_by(*crud._order_by(sort)).limit(limit))
+        )
+    queries.append(
+        (
+            "GET /pages?sort=followers&cursor=",
+            select(models.Page)
+            .where(crud._after_cursor("followers", 1000, 42))
+            .order_by(*crud._order_by("followers"))
+            .limit(limit),
+        )
+    )
+    stmt, _ = apply_search(db, select(models.Page), "data platform")
+    queries.append(("GET /pages?q=", stmt.limit(limit)))
+    return queries
+
+
+def _sqlite_scans(rows) -> List[str]:
+    # detail column of EXPLAIN QUERY PLAN, e.g. "SCAN pages" or
+    # "SEARCH posts USING INDEX ix_posts_page_id_posted_at (page_id=?)"
+    scans = []
+    for row in rows:
+        detail = row[-1]
+        if detail.startswith("SCAN ") and " USING " not in detail:
+            if "VIRTUAL TABLE" not in detail:
+                scans.append(detail)
+    return scans
+
+
+def _postgres_scans(plan: dict) -> List[str]:
+    scans = []
+    if plan.get("Node Type") == "Seq Scan":
+        scans.append(f"Seq Scan on {plan.get('Relation Name')}")
+    for child in plan.get("Plans", []):
+        scans += _postgres_scans(child)
+    return scans
+
+
+async def explain(db: AsyncSession, stmt) -> Tuple[str, List[str]]:
+    """
+    (printable plan, full table scans found in it) for one statement.
+    """
+    dialect = db.get_bind().dialect
+    sql = str(stmt.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+    if dialect.name == "sqlite":
+        rows = (await db.execute(text(f"EXPLAIN QUERY PLAN {sql}"))).all()
+        return "\n".join(row[-1] for row in rows), _sqlite_scans(rows)
+    if dialect.name == "postgresql":
+        res = await db.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"))
+        plan = res.scalar_one()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        plan = plan[0]["Plan"]
+        return json.dumps(plan, indent=2), _postgres_scans(plan)
+    raise RuntimeError(f"EXPLAIN is not supported for {dialect.name}")
+
+
+async def check_plans() -> int:
+    """
+    Print the plan of every hot query; return the number of full scans.
+    """
+    failures = 0
+    async with AsyncSessionLocal() as db:
+        if db.get_bind().dialect.name == "postgresql":
+            await db.execute(text("SET enable_seqscan = off"))
+        for label, stmt in hot_queries(db):
+            plan, scans = await explain(db, stmt)
+            status = "FULL SCAN" if scans else "ok"
+            print(f"== {label}: {status}")
+            print(plan)
+            failures += bool(scans)
+    return failures
+
+
+def upgrade_schema():
+    """
+    `alembic upgrade head` on settings.DATABASE_URL. Call it outside the
+    event loop: the migration environment runs its own.
+    """
+    root = Path(__file__).resolve().parent.parent
+    config = Config(str(root / "alembic.ini"))
+    config.set_main_option("script_location", str(root / "migrations"))
+    command.upgrade(config, "head")
+
+
+async def _main() -> int:
+    # schema comes from the migrations: only pick up their search index
+    await init_db(create_schema=False)
+    failures = await check_plans()
+    if failures:
+        print(f"{failures} queries do a full table scan", file=sys.stderr)
+    await dispose_engines()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    upgrade_schema()
+    sys.exit(asyncio.run(_main()))
@@ -0,0 +1,42 @@
+# app/fingerprint.py
+import hashlib
+import json
+from datetime import date, datetime, timezone
+from typing import Any, Dict
+
+SECTIONS = ("page", "posts", "followers")
+
+
+def _default(value: Any) -> str:
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def content_hash(value: Any) -> str:
+    """
+    Stable sha256 of a JSON-able value (key order and whitespace don't matter).
+    """
+    encoded = json.dumps(
+        value, sort_keys=True, separators=(",", ":"), default=_default
+    ).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def fingerprint_scrape(scraped: dict) -> Dict[str, str]:
+    """
+    Hash each section of a scrape payload separately.
+    Posts and followers are sorted by their LinkedIn ids first, so a scrape
+    that only returns the same rows in a different order hashes the same.
+    """
+    posts = sorted(scraped.get("posts", []), key=lambda p: p["linkedin_post_id"])
+    followers = sorted(
+        scraped.get("followers", []), key=lambda f: f["linkedin_user_id"]
+    )
+    return {
+        "page": content_hash(scraped["page"]),
+        "posts": content_hash(posts),
+        "followers": content_hash(followers),
+    }
@@ -0,0 +1,412 @@
+# app/ingest.py
+"""
+Bulk load of offline scrape dumps.
+
+Reads a JSONL file (gzipped if the name ends in .gz) with one payload per
+line in the shape scrape_linkedin_page returns ({page, posts, followers}),
+streaming it in chunks of --chunk-size pages, one transaction per chunk:
+
+- pages not in the database yet are written with multi-row INSERTs (COPY on
+  Postgres): the page, its posts, follower links, fingerprints, follower
+  set and search index rows. Users are upserted like a sync does, since
+  concurrent syncs share them.
+- pages that already exist go through create_or_update_page_from_scrape,
+  like a sync, so unchanged sections are skipped.
+
+    python -m app.ingest dump.jsonl.gz [--chunk-size 500] [--restart]
+
+After each committed chunk the byte offset reached is saved to a checkpoint
+(<dump>.checkpoint unless --checkpoint is given), and a rerun resumes from
+there. Insights of new pages are computed once at the end with
+backfill_insights, which also catches pages an interrupted run left without
+them. Lines that aren't valid payloads are reported on stderr and skipped.
+
+New pages are inserted without ON CONFLICT: if a sync creates the same page
+meanwhile, the chunk fails and the rerun writes it as an update.
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import IO, Any, Dict, Iterable, List
+from sqlalchemy import BigInteger, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import crud, models
+from .audience import encode_ids
+from .cache import invalidate_cached_page, stop_cache
+from .config import settings
+from .database import AsyncSessionLocal, dispose_engines, init_db
+from .fingerprint import fingerprint_scrape
+from .insights import backfill_insights
+from .search import index_pages
+
+_TABLES = {
+    "page": models.Page.__table__,
+    "posts": models.Post.__table__,
+    "followers": models.SocialMediaUser.__table__,
+}
+# keys a payload must have, per section
+_REQUIRED = {
+    "page": ("linkedin_page_id", "name", "url"),
+    "posts": ("linkedin_post_id",),
+    "followers": ("linkedin_user_id", "name"),
+}
+# set by the database, never taken from a dump
+_GENERATED = {"id", "page_id", "created_at", "updated_at"}
+
+
+def _coerce(column, value: Any) -> Any:
+    """
+    A dump value as the column's type: numeric strings and whole floats to
+    integers, numbers to strings, ISO strings to datetimes. Raises ValueError
+    for anything that would fail at insert time instead.
+    """
+    if value is None:
+        if not column.nullable:
+            raise ValueError("null")
+        return None
+    kind = column.type.python_type
+    if kind is int:
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        elif isinstance(value, str) and value.strip().lstrip("-").isdigit():
+            value = int(value)
+        if isinstance(value, bool) or not isinstance(value, int):
+            raise ValueError("not an integer")
+        if not isinstance(column.type, BigInteger) and not -(2**31) <= value < 2**31:
+            raise ValueError("out of range")
+    elif kind is str:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = str(value)
+        if not isinstance(value, str):
+            raise ValueError("not a string")
+        length = getattr(column.type, "length", None)
+        if length and len(value) > length:
+            raise ValueError(f"longer than {length}")
+    elif kind is datetime:
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        if not isinstance(value, datetime):
+            raise ValueError("not a date")
+    return value
+
+
+def _clean(payload: Any) -> Dict[str, Any]:
+    """
+    A dump line as a scrape payload: only the keys the tables have, each
+    value of its column's type. Raises ValueError if it isn't one, so a bad
+    record is rejected on its own instead of failing its chunk's insert.
+    """
+    if not isinstance(payload, dict) or not isinstance(payload.get("page"), dict):
+        raise ValueError("no page object")
+    cleaned: Dict[str, Any] = {}
+    for section, table in _TABLES.items():
+        rows = payload.get(section) or []
+        if section == "page":
+            rows = [rows]
+        if not isinstance(rows, list) or not all(isinstance(r, dict) for r in rows):
+            raise ValueError(f"{section} is not a list of objects")
+        columns = {c.name: c for c in table.columns if c.name not in _GENERATED}
+        for row in rows:
+            missing = [key for key in _REQUIRED[section] if not row.get(key)]
+            if missing:
+                raise ValueError(f"{section} without {', '.join(missing)}")
+        typed = []
+        for row in rows:
+            values = {}
+            for key, value in row.items():
+                if key not in columns:
+                    continue
+                try:
+                    values[key] = _coerce(columns[key], value)
+                except ValueError as e:
+                    raise ValueError(f"{section}.{key}: {e}") from None
+            typed.append(values)
+        rows = typed
+        cleaned[section] = rows[0] if section == "page" else rows
+    return cleaned
+
+
+def _copy_value(value: Any) -> Any:
+    # asyncpg reads naive datetimes as local time; scrapes are naive UTC
+    if isinstance(value, datetime) and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+async def _insert_rows(db: AsyncSession, table, rows: List[dict]):
+    """
+    Write `rows` with multi-row INSERTs, or a single COPY on Postgres.
+    """
+    if not rows:
+        return
+    columns = list(dict.fromkeys(key for row in rows for key in row))
+    conn = await db.connection()
+    if conn.dialect.name == "postgresql":
+        # runs inside the chunk's transaction: asyncpg's was begun by the
+        # SELECT that every chunk starts with
+        raw = (await conn.get_raw_connection()).driver_connection
+        if hasattr(raw, "copy_records_to_table"):
+            await raw.copy_records_to_table(
+                table.name,
+                columns=columns,
+                records=[
+                    tuple(_copy_value(row.get(c)) for c in columns) for row in rows
+                ],
+            )
+            return
+    per_statement = max(1, crud._MAX_PARAMS // len(columns))
+    for chunk in crud._chunks(rows, per_statement):
+        await db.execute(
+            insert(table).values([{c: row.get(c) for c in columns} for row in chunk])
+        )
+
+
+async def _page_ids(db: AsyncSession, slugs: Iterable[str]) -> Dict[str, int]:
+    ids: Dict[str, int] = {}
+    page = models.Page
+    for chunk in crud._chunks(list(slugs), crud._MAX_PARAMS):
+        res = await db.execute(
+            select(page.linkedin_page_id, page.id).where(
+                page.linkedin_page_id.in_(chunk)
+            )
+        )
+        ids.update(res.tuples().all())
+    return ids
+
+
+async def _insert_new(db: AsyncSession, payloads: Dict[str, dict]) -> Counter:
+    """
+    Bulk-write pages that aren't in the database yet, with everything a sync
+    would have written for them except insights.
+    """
+    pages = [p["page"] for p in payloads.values()]
+    await _insert_rows(db, models.Page.__table__, pages)
+    page_ids = await _page_ids(db, payloads)
+
+    posts = []
+    for slug, payload in payloads.items():
+        # last occurrence wins if a page repeats a post (as in sync_posts)
+        by_post_id = {p["linkedin_post_id"]: p for p in payload["posts"]}
+        posts.extend({"page_id": page_ids[slug], **p} for p in by_post_id.values())
+    await _insert_rows(db, models.Post.__table__, posts)
+
+    users = {
+        f["linkedin_user_id"]: f for p in payloads.values() for f in p["followers"]
+    }
+    user_ids, user_stats = await crud.upsert_users(db, users)
+    links, follower_sets, fingerprints = [], [], []
+    for slug, payload in payloads.items():
+        page_id = page_ids[slug]
+        followers = sorted(
+            {user_ids[f["linkedin_user_id"]] for f in payload["followers"]}
+        )
+        links.extend({"page_id": page_id, "user_id": u} for u in followers)
+        follower_sets.append(
+            {
+                "page_id": page_id,
+                "follower_count": len(followers),
+                "user_ids": encode_ids(followers),
+            }
+        )
+        fingerprints.extend(
+            {"page_id": page_id, "section": section, "content_hash": digest}
+            for section, digest in fingerprint_scrape(payload).items()
+        )
+    await _insert_rows(db, models.PageFollower.__table__, links)
+    await _insert_rows(db, models.PageFollowerSet.__table__, follower_sets)
+    await _insert_rows(db, models.PageFingerprint.__table__, fingerprints)
+    for chunk in crud._chunks(list(page_ids.values()), crud._MAX_PARAMS):
+        await index_pages(db, chunk)
+
+    return Counter(
+        pages_inserted=len(payloads),
+        posts=len(posts),
+        users=user_stats["users_inserted"],
+        followers=len(links),
+    )
+
+
+async def write_chunk(payloads: Dict[str, dict]) -> Counter:
+    """
+    Write one chunk of payloads, keyed by page slug, in one transaction.
+    Returns row counts.
+    """
+    counts: Counter = Counter()
+    changed = []
+    async with AsyncSessionLocal() as db:
+        existing = await _page_ids(db, payloads)
+        for slug in existing:
+            _, stats = await crud.create_or_update_page_from_scrape(
+                db, payloads[slug], commit=False
+            )
+            if crud.is_unchanged(stats, "page", "posts", "followers"):
+                counts["pages_unchanged"] += 1
+                continue
+            counts["pages_updated"] += 1
+            counts["posts"] += stats["posts"].get("inserted", 0)
+            counts["users"] += stats["followers"].get("users_inserted", 0)
+            counts["followers"] += stats["followers"].get("inserted", 0)
+            if not crud.is_unchanged(stats, "page", "posts"):
+                changed.append(slug)
+
+        new = {slug: p for slug, p in payloads.items() if slug not in existing}
+        if new:
+            counts += await _insert_new(db, new)
+        await db.commit()
+
+    # cached copies of updated pages are stale now (shared with the app
+    # through the Redis backend)
+    for slug in changed:
+        await invalidate_cached_page(slug)
+    return counts
+
+
+def _open(path: str) -> IO[bytes]:
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def _load_checkpoint(path: Path, source: str) -> Dict[str, Any]:
+    try:
+        state = json.loads(path.read_text())
+    except FileNotFoundError:
+        return {"source": source, "offset": 0, "lines": 0}
+    if state.get("source") != source:
+        raise RuntimeError(
+            f"{path} is the checkpoint of {state.get('source')}; "
+            "pass --restart or another --checkpoint"
+        )
+    return state
+
+
+def _save_checkpoint(path: Path, state: Dict[str, Any]):
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(state))
+    os.replace(tmp, path)
+
+
+def _rows(counts: Counter) -> int:
+    return sum(
+        counts[key]
+        for key in ("pages_inserted", "pages_updated", "posts", "users", "followers")
+    )
+
+
+async def ingest(
+    path: str, checkpoint: Path, chunk_size: int = 500, restart: bool = False
+) -> Dict[str, Any]:
+    """
+    Load a dump from its checkpoint on, committing and checkpointing every
+    `chunk_size` pages. Returns the counts and timings of this run.
+    """
+    source = str(Path(path).resolve())
+    state = {"source": source, "offset": 0, "lines": 0}
+    if not restart:
+        state = _load_checkpoint(checkpoint, source)
+    if state["offset"]:
+        print(
+            f"resuming at line {state['lines'] + 1} (byte {state['offset']})",
+            file=sys.stderr,
+        )
+
+    counts: Counter = Counter()
+    started = time.perf_counter()
+    batch: Dict[str, dict] = {}
+    offset, lines = state["offset"], state["lines"]
+
+    async def flush():
+        counts.update(await write_chunk(batch))
+        batch.clear()
+        state.update(offset=offset, lines=lines)
+        _save_checkpoint(checkpoint, state)
+        elapsed = time.perf_counter() - started
+        rows = _rows(counts)
+        print(
+            f"line {lines}: {rows} rows ({rows / elapsed:,.0f} rows/s)",
+            file=sys.stderr,
+        )
+
+    with _open(path) as f:
+        f.seek(offset)
+        for line in f:
+            offset += len(line)
+            lines += 1
+            if not line.strip():
+                continue
+            try:
+                payload = _clean(json.loads(line))
+            except ValueError as e:
+                counts["rejected"] += 1
+                print(f"line {lines}: skipped, {e}", file=sys.stderr)
+                continue
+            # a page repeated within a chunk: the later line wins
+            batch[payload["page"]["linkedin_page_id"]] = payload
+            if len(batch) >= chunk_size:
+                await flush()
+    if batch or offset != state["offset"]:
+        await flush()
+    rows_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        insights = await backfill_insights(db)
+    return {
+        **counts,
+        "rows": _rows(counts),
+        "rows_seconds": rows_seconds,
+        "insights": insights,
+        "insights_seconds": time.perf_counter() - started,
+    }
+
+
+async def _main(args) -> int:
+    await init_db(create_schema=settings.DB_CREATE_SCHEMA)
+    checkpoint = Path(args.checkpoint or args.path + ".checkpoint")
+    try:
+        result = await ingest(args.path, checkpoint, args.chunk_size, args.restart)
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        await stop_cache()
+        await dispose_engines()
+
+    seconds = result["rows_seconds"]
+    print(
+        f"{result.get('pages_inserted', 0)} pages inserted, "
+        f"{result.get('pages_updated', 0)} updated, "
+        f"{result.get('pages_unchanged', 0)} unchanged, "
+        f"{result.get('rejected', 0)} lines rejected"
+    )
+    print(
+        f"{result['rows']} rows in {seconds:.1f}s "
+        f"({result['rows'] / max(seconds, 1e-9):,.0f} rows/s); "
+        f"insights for {result['insights']} pages in "
+        f"{result['insights_seconds']:.1f}s"
+    )
+    return 0
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.ingest", description=__doc__)
+    parser.add_argument("path", help="JSONL dump, optionally .gz")
+    parser.add_argument(
+        "--chunk-size", type=int, default=500, help="pages per transaction"
+    )
+    parser.add_argument("--checkpoint", help="default: <path>.checkpoint")
+    parser.add_argument(
+        "--restart", action="store_true", help="ignore the checkpoint"
+    )
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(_parse_args())))
@@ -0,0 +1,183 @@
+# app/insights.py
+"""
+Per-page engagement aggregates (the page_insights table).
+
+They are maintained at write time by create_or_update_page_from_scrape, so
+GET /pages/{page_id}/insights and the engagement sorts of GET /pages read a
+single row instead of aggregating posts per request.
+
+    python -m app.insights     # compute insights for pages that have none
+"""
+import asyncio
+import json
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import models
+from .database import AsyncSessionLocal, dispose_engines, init_db
+
+TOP_POSTS = 5
+_WEEK_SECONDS = 7 * 24 * 3600
+
+
+def _engagement():
+    post = models.Post
+    return (
+        func.coalesce(post.like_count, 0)
+        + func.coalesce(post.comment_count, 0)
+        + func.coalesce(post.share_count, 0)
+    )
+
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _average(total: int, count: int) -> Optional[float]:
+    return total / count if count else None
+
+
+def _posts_per_week(
+    count: int, first: Optional[datetime], last: Optional[datetime]
+) -> Optional[float]:
+    # intervals between posts over the span they cover
+    if count < 2 or first is None or last is None:
+        return None
+    span = (_naive_utc(last) - _naive_utc(first)).total_seconds()
+    if span <= 0:
+        return None
+    return (count - 1) / (span / _WEEK_SECONDS)
+
+
+def _rate(avg_engagement: Optional[float], follower_count: Optional[int]):
+    if avg_engagement is None or not follower_count:
+        return None
+    return avg_engagement / follower_count
+
+
+async def _aggregate_posts(db: AsyncSession, page_id: int) -> Dict[str, Any]:
+    post = models.Post
+    stmt = select(
+        func.count(post.id),
+        func.coalesce(func.sum(post.like_count), 0),
+        func.coalesce(func.sum(post.comment_count), 0),
+        func.coalesce(func.sum(post.share_count), 0),
+        func.min(post.posted_at),
+        func.max(post.posted_at),
+    ).where(post.page_id == page_id)
+    count, likes, comments, shares, first, last = (await db.execute(stmt)).one()
+
+    engagement = _engagement().label("engagement")
+    top = await db.execute(
+        select(
+            post.linkedin_post_id,
+            post.content_text,
+            post.like_count,
+            post.comment_count,
+            post.share_count,
+            engagement,
+            post.posted_at,
+        )
+        .where(post.page_id == page_id)
+        .order_by(engagement.desc(), post.posted_at.desc().nullslast(), post.id)
+        .limit(TOP_POSTS)
+    )
+    top_posts = [
+        {
+            **row,
+            "posted_at": row["posted_at"].isoformat() if row["posted_at"] else None,
+        }
+        for row in top.mappings()
+    ]
+
+    total = likes + comments + shares
+    return {
+        "post_count": count,
+        "total_likes": likes,
+        "total_comments": comments,
+        "total_shares": shares,
+        "total_engagement": total,
+        "avg_likes": _average(likes, count),
+        "avg_comments": _average(comments, count),
+        "avg_shares": _average(shares, count),
+        "avg_engagement": _average(total, count),
+        "posts_per_week": _posts_per_week(count, first, last),
+        "first_post_at": first,
+        "last_post_at": last,
+        "top_posts": json.dumps(top_posts),
+    }
+
+
+async def update_insights(
+    db: AsyncSession, page: models.Page, posts_changed: bool = True
+) -> models.PageInsight:
+    """
+    Bring a page's insights up to date after a sync (flushes, no commit).
+
+    Post aggregates are only recomputed when the posts changed; a page-only
+    change (e.g. a new follower_count) just re-derives the engagement rate.
+    """
+    stmt = select(models.PageInsight).where(models.PageInsight.page_id == page.id)
+    insight = (await db.execute(stmt)).scalar_one_or_none()
+    if insight is None:
+        insight = models.PageInsight(page_id=page.id)
+        db.add(insight)
+        posts_changed = True
+
+    if posts_changed:
+        for key, value in (await _aggregate_posts(db, page.id)).items():
+            setattr(insight, key, value)
+    insight.engagement_rate = _rate(insight.avg_engagement, page.follower_count)
+    insight.computed_at = func.now()
+    await db.flush()
+    return insight
+
+
+def insight_data(page: models.Page, insight: models.PageInsight) -> Dict[str, Any]:
+    """
+    Row of page_insights as a dict for schemas.PageInsights.
+    """
+    data = {
+        column.name: getattr(insight, column.name)
+        for column in models.PageInsight.__table__.columns
+    }
+    data.update(page_id=page.linkedin_page_id, follower_count=page.follower_count)
+    return data
+
+
+async def backfill_insights(db: AsyncSession, batch_size: int = 500) -> int:
+    """
+    Compute insights for every page that has none yet (pages synced before
+    the table existed). Commits per batch; returns the number of pages done.
+    """
+    done = 0
+    while True:
+        stmt = (
+            select(models.Page)
+            .outerjoin(models.PageInsight)
+            .where(models.PageInsight.id.is_(None))
+            .order_by(models.Page.id)
+            .limit(batch_size)
+        )
+        pages = (await db.execute(stmt)).scalars().all()
+        if not pages:
+            return done
+        for page in pages:
+            await update_insights(db, page)
+        await db.commit()
+        done += len(pages)
+
+
+async def _main():
+    await init_db()
+    async with AsyncSessionLocal() as db:
+        done = await backfill_insights(db)
+    await dispose_engines()
+    print(f"computed insights for {done} pages")
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -0,0 +1,83 @@
+# app/jobs.py
+import asyncio
+import logging
+import os
+import socket
+from typing import List, Optional
+from . import crud, sync
+from .config import settings
+from .database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+class JobWorker:
+    """
+    Drains the sync_jobs table: claim a queued job, run sync.sync_page for it,
+    record the outcome. Any number of these can run, in this process or
+    others, since claiming is atomic (see crud.claim_sync_job).
+    """
+
+    def __init__(self, concurrency: int, poll_seconds: float):
+        self.concurrency = concurrency
+        self.poll_seconds = poll_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._loop()) for _ in range(self.concurrency)
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def wake(self):
+        """
+        A job was just queued in this process: skip the rest of the poll wait.
+        """
+        self._wakeup.set()
+
+    async def run_once(self) -> Optional[int]:
+        """
+        Claim and run one job; returns its id, or None if the queue was empty.
+        """
+        async with AsyncSessionLocal() as db:
+            job = await crud.claim_sync_job(db, self.worker_id)
+            if job is None:
+                return None
+            try:
+                _, stats = await sync.sync_page(job.linkedin_page_id)
+            except Exception as exc:
+                logger.exception("sync job %s failed", job.id)
+                await crud.finish_sync_job(db, job, error=str(exc) or repr(exc))
+            else:
+                await crud.finish_sync_job(db, job, result=stats)
+            return job.id
+
+    async def _loop(self):
+        while True:
+            try:
+                job_id = await self.run_once()
+            except Exception:
+                logger.exception("claiming a sync job failed")
+                job_id = None
+            if job_id is not None:
+                continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+
+job_worker = JobWorker(
+    concurrency=settings.JOB_WORKERS,
+    poll_seconds=settings.JOB_POLL_SECONDS,
+)
@@ -1,126 +1,235 @@
 # app/main.py
-from typing import List, Optional
-from fastapi import FastAPI, Depends, HTTPException, Query
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Dict, List, Optional
+from fastapi import FastAPI, Depends, Header, HTTPException, Query, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from .database import init_db
-from .deps import get_db
-from . import crud, schemas
-from .scraper import scrape_linkedin_page
-from .cache import get_cached_page, set_cached_page
+from .database import AsyncReadSessionLocal, dispose_engines, init_db
+from .deps import get_db, get_read_db
+from . import audience, crud, schemas, sync
+from .insights import insight_data, update_insights
+from .jobs import job_worker
+from .scheduler import scheduler
+from .cache import json_default, load_snapshot, save_snapshot, start_cache, stop_cache
 from .config import settings
-from .models import Page, Post, SocialMediaUser, PageFollower
+from . import metrics
+from .metrics import CONTENT_TYPE, MetricsMiddleware, render
+from . import profiling
+from .scraper import PageNotFound, ScrapeError, scraper_engine
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(title="LinkedIn Insights Service")
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+if settings.PROFILING_ENABLED:
+    app.add_middleware(profiling.ProfilingMiddleware)
+
+# seconds per startup phase, exported as app_startup_seconds
+_startup: Dict[str, float] = {}
+_warming: Optional[asyncio.Task] = None
+
+
+def _process_age() -> Optional[float]:
+    # seconds since the process was started (Linux /proc only)
+    try:
+        with open("/proc/self/stat") as f:
+            started_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+    return uptime - started_ticks / os.sysconf("SC_CLK_TCK")
+
+
+metrics.register(
+    metrics.Collected(
+        "app_startup_seconds",
+        "Startup time by phase (process: from exec until ready to serve).",
+        "gauge",
+        lambda: {(phase,): seconds for phase, seconds in _startup.items()},
+        labels=("phase",),
+    )
+)
 
 
 @app.on_event("startup")
 async def on_startup():
-    await init_db()
+    global _warming
+    started = time.perf_counter()
+    await init_db(create_schema=settings.DB_CREATE_SCHEMA)
+    _startup["schema"] = time.perf_counter() - started
+
+    phase_started = time.perf_counter()
+    await start_cache()
+    if settings.CACHE_SNAPSHOT_PATH:
+        loaded, stale = load_snapshot(settings.CACHE_SNAPSHOT_PATH)
+        logger.info("warmed %d cached pages from the snapshot", loaded)
+        if stale:
+            # hot pages whose saved copy is too old: reload them from the DB
+            _warming = asyncio.create_task(sync.warm_pages(stale))
+    _startup["cache"] = time.perf_counter() - phase_started
+
+    await job_worker.start()
+    if settings.SCHEDULER_ENABLED:
+        await scheduler.start()
+    _startup["startup"] = time.perf_counter() - started
+    process_age = _process_age()
+    if process_age is not None:
+        _startup["process"] = process_age
+    logger.info("started in %.3fs", _startup["startup"])
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    if _warming is not None:
+        _warming.cancel()
+    await scheduler.stop()
+    await job_worker.stop()
+    if settings.CACHE_SNAPSHOT_PATH:
+        saved = save_snapshot(
+            settings.CACHE_SNAPSHOT_PATH, settings.CACHE_SNAPSHOT_MAX_ENTRIES
+        )
+        logger.info("saved %d cached pages to the snapshot", saved)
+    await stop_cache()
+    await scraper_engine.close()
+    await dispose_engines()
 
 
-@app.post("/pages/{page_id}/sync", response_model=schemas.Page)
+@app.exception_handler(ScrapeError)
+async def scrape_error_handler(request, exc: ScrapeError):
+    if isinstance(exc, PageNotFound):
+        return JSONResponse(status_code=404, content={"detail": "Page not found"})
+    return JSONResponse(status_code=502, content={"detail": f"Scrape failed: {exc}"})
+
+
+@app.post(
+    "/pages/{page_id}/sync",
+    response_model=schemas.PageSync,
+    responses={202: {"model": schemas.SyncJob}},
+)
 async def sync_page(
     page_id: str,
+    run_async: bool = Query(default=False, alias="async"),
     db: AsyncSession = Depends(get_db),
 ):
-    # scrape + save to DB
-    scraped = await scrape_linkedin_page(page_id)
-    page = await crud.create_or_update_page_from_scrape(db, scraped)
-
-    # explicitly load posts (avoid accessing page.posts lazily)
-    stmt = (
-        select(Post)
-        .where(Post.page_id == page.id)
-        .order_by(Post.posted_at.desc().nullslast())
-    )
-    res = await db.execute(stmt)
-    posts = res.scalars().all()
+    if run_async:
+        # queue it and answer right away; poll GET /jobs/{id} for the outcome
+        job = await crud.create_sync_job(db, page_id)
+        job_worker.wake()
+        return JSONResponse(
+            status_code=202,
+            content=jsonable_encoder(schemas.SyncJob.model_validate(job)),
+            headers={"Location": f"/jobs/{job.id}"},
+        )
 
-    page_schema = schemas.Page(
-        id=page.id,
-        linkedin_page_id=page.linkedin_page_id,
-        linkedin_platform_id=page.linkedin_platform_id,
-        name=page.name,
-        url=page.url,
-        profile_image_url=page.profile_image_url,
-        description=page.description,
-        website=page.website,
-        industry=page.industry,
-        follower_count=page.follower_count,
-        headcount=page.headcount,
-        specialities=page.specialities,
-        posts=[schemas.Post.model_validate(p) for p in posts],
-    )
+    # scrape + save to DB + refresh cache (shared by concurrent calls)
+    page, stats = await sync.sync_page(page_id)
+    return {**page.data(), "sync": stats}
 
-    data = page_schema.model_dump()
-    await set_cached_page(page_id, data)
-    return data
 
+@app.get("/jobs/{job_id}", response_model=schemas.SyncJob)
+async def get_job(job_id: int, db: AsyncSession = Depends(get_db)):
+    job = await crud.get_sync_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
-@app.get("/pages/{page_id}", response_model=schemas.Page)
-async def get_page(
-    page_id: str,
-    db: AsyncSession = Depends(get_db),
-):
-    # check cache first
-    cached = await get_cached_page(page_id)
-    if cached:
-        return cached
 
-    page = await crud.get_page_by_slug(db, page_id)
-    if not page:
-        scraped = await scrape_linkedin_page(page_id)
-        page = await crud.create_or_update_page_from_scrape(db, scraped)
-
-    # explicitly load posts
-    stmt = (
-        select(Post)
-        .where(Post.page_id == page.id)
-        .order_by(Post.posted_at.desc().nullslast())
-    )
-    res = await db.execute(stmt)
-    posts = res.scalars().all()
+@app.post("/pages/sync")
+async def sync_pages(body: schemas.BatchSyncRequest):
+    """
+    Sync many pages in one call; streams one NDJSON result line per page.
+    """
+    if len(body.page_ids) > settings.SYNC_MAX_PAGES:
+        raise HTTPException(
+            status_code=422,
+            detail=f"At most {settings.SYNC_MAX_PAGES} pages per batch",
+        )
 
-    page_schema = schemas.Page(
-        id=page.id,
-        linkedin_page_id=page.linkedin_page_id,
-        linkedin_platform_id=page.linkedin_platform_id,
-        name=page.name,
-        url=page.url,
-        profile_image_url=page.profile_image_url,
-        description=page.description,
-        website=page.website,
-        industry=page.industry,
-        follower_count=page.follower_count,
-        headcount=page.headcount,
-        specialities=page.specialities,
-        posts=[schemas.Post.model_validate(p) for p in posts],
+    async def lines():
+        async for result in sync.sync_pages(body.page_ids):
+            yield json.dumps(result) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    # weak comparison (RFC 9110 13.1.2): W/ prefixes don't matter
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in (
+        t.removeprefix("W/") for t in tags
     )
 
-    data = page_schema.model_dump()
-    await set_cached_page(page_id, data)
-    return data
+
+@app.get("/pages/{page_id}", response_model=schemas.Page)
+async def get_page(
+    page_id: str,
+    if_none_match: Optional[str] = Header(default=None),
+    accept_encoding: str = Header(default=""),
+):
+    # cache, then DB, then scraper; stale data is served while it refreshes
+    scheduler.record_read(page_id)
+    page, age = await sync.read_page(page_id)
+    headers = {"ETag": page.etag, "Age": str(int(age)), "Vary": "Accept-Encoding"}
+    if _etag_matches(if_none_match, page.etag):
+        return Response(status_code=304, headers=headers)
+    # the cached bytes are the response: no validation or re-encoding
+    if page.gzipped is not None and "gzip" in accept_encoding.lower():
+        headers["Content-Encoding"] = "gzip"
+        return Response(page.gzipped, media_type="application/json", headers=headers)
+    return Response(page.body, media_type="application/json", headers=headers)
 
 
 @app.get("/pages", response_model=schemas.PaginatedPages)
 async def list_pages(
     name: Optional[str] = Query(default=None),
+    q: Optional[str] = Query(default=None, max_length=200),
     industry: Optional[str] = Query(default=None),
     followers_min: Optional[int] = Query(default=None, alias="followersMin"),
     followers_max: Optional[int] = Query(default=None, alias="followersMax"),
     page: int = Query(default=1, ge=1),
     limit: int = Query(default=10, ge=1, le=100),
-    db: AsyncSession = Depends(get_db),
+    sort: Optional[str] = Query(
+        default=None,
+        pattern=(
+            "^(id|followers|name|relevance|engagement_rate|avg_engagement"
+            "|total_engagement|posts_per_week)$"
+        ),
+    ),
+    cursor: Optional[str] = Query(default=None),
+    count: str = Query(default="exact", pattern="^(exact|cached|estimate|none)$"),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    total, items = await crud.search_pages(
-        db, name, industry, followers_min, followers_max, page, limit
-    )
+    try:
+        total, items, next_cursor = await crud.search_pages(
+            db,
+            name,
+            industry,
+            followers_min,
+            followers_max,
+            page,
+            limit,
+            sort=sort,
+            cursor=cursor,
+            count=count,
+            q=q,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
     return {
         "total": total,
         "page": page,
         "limit": limit,
         "items": items,
+        "next_cursor": next_cursor,
     }
 
 
@@ -128,21 +237,13 @@ async def list_pages(
 async def get_page_posts(
     page_id: str,
     limit: int = Query(default=10, ge=1, le=50),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    stmt_page = select(Page).where(Page.linkedin_page_id == page_id)
-    res_page = await db.execute(stmt_page)
-    page = res_page.scalar_one_or_none()
+    page = await crud.get_page_by_slug(db, page_id)
     if not page:
         raise HTTPException(status_code=404, detail="Page not found")
 
-    stmt = (
-        select(Post)
-        .where(Post.page_id == page.id)
-        .order_by(Post.posted_at.desc().nullslast())
-        .limit(limit)
-    )
-    res = await db.execute(stmt)
+    res = await db.execute(crud.page_posts_stmt(page.id, limit))
     posts = res.scalars().all()
     return [schemas.Post.model_validate(p) for p in posts]
 
@@ -151,20 +252,159 @@ async def get_page_posts(
 async def get_page_followers(
     page_id: str,
     limit: int = Query(default=20, ge=1, le=100),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    stmt_page = select(Page).where(Page.linkedin_page_id == page_id)
-    res_page = await db.execute(stmt_page)
-    page = res_page.scalar_one_or_none()
+    page = await crud.get_page_by_slug(db, page_id)
     if not page:
         raise HTTPException(status_code=404, detail="Page not found")
 
-    stmt = (
-        select(SocialMediaUser)
-        .join(PageFollower, PageFollower.user_id == SocialMediaUser.id)
-        .where(PageFollower.page_id == page.id)
-        .limit(limit)
-    )
-    res = await db.execute(stmt)
+    res = await db.execute(crud.page_followers_stmt(page.id, limit))
     users = res.scalars().all()
     return [schemas.FollowerUser.model_validate(u) for u in users]
+
+
+@app.get("/pages/{page_id}/insights", response_model=schemas.PageInsights)
+async def get_page_insights(page_id: str, db: AsyncSession = Depends(get_db)):
+    found = await crud.get_page_insight(db, page_id)
+    if not found:
+        raise HTTPException(status_code=404, detail="Page not found")
+    page, insight = found
+    if insight is None:
+        # page stored before insights existed; computed once, then kept by syncs
+        insight = await update_insights(db, page)
+        await db.commit()
+        await db.refresh(insight)
+
+    return insight_data(page, insight)
+
+
+@app.get(
+    "/pages/{page_id}/audience/overlap/{other_page_id}",
+    response_model=schemas.AudienceOverlap,
+)
+async def get_audience_overlap(
+    page_id: str, other_page_id: str, db: AsyncSession = Depends(get_db)
+):
+    data = await audience.get_overlap(db, page_id, other_page_id)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Page not found")
+    return data
+
+
+@app.get(
+    "/pages/{page_id}/audience/similar", response_model=schemas.SimilarAudiences
+)
+async def get_similar_audiences(
+    page_id: str,
+    limit: int = Query(default=10, ge=1, le=100),
+    by: str = Query(default="jaccard", pattern="^(jaccard|shared)$"),
+    db: AsyncSession = Depends(get_db),
+):
+    data = await audience.get_similar(db, page_id, limit, by)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Page not found")
+    return data
+
+
+@app.get("/export/pages.ndjson")
+async def export_pages(
+    name: Optional[str] = Query(default=None),
+    q: Optional[str] = Query(default=None, max_length=200),
+    industry: Optional[str] = Query(default=None),
+    followers_min: Optional[int] = Query(default=None, alias="followersMin"),
+    followers_max: Optional[int] = Query(default=None, alias="followersMax"),
+    include: str = Query(default="posts,followers", pattern="^[a-z,]*$"),
+):
+    """
+    Stream every matching page (same filters as GET /pages) as NDJSON, one
+    page per line with its posts and followers embedded.
+    """
+    parts = set(include.split(","))
+
+    async def lines():
+        # own sessions: the request-scoped one is closed before streaming
+        pages_db, related_db = AsyncReadSessionLocal(), AsyncReadSessionLocal()
+        async with pages_db, related_db:
+            async for records in crud.export_pages(
+                pages_db,
+                related_db,
+                name,
+                industry,
+                followers_min,
+                followers_max,
+                q=q,
+                posts="posts" in parts,
+                followers="followers" in parts,
+                chunk_size=settings.EXPORT_CHUNK_SIZE,
+            ):
+                yield "".join(
+                    json.dumps(r, default=json_default, ensure_ascii=False) + "\n"
+                    for r in records
+                )
+
+    return StreamingResponse(
+        lines(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="pages.ndjson"'},
+    )
+
+
+@app.get("/scheduler/status", response_model=schemas.SchedulerStatus)
+async def scheduler_status():
+    return scheduler.status()
+
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """
+    Prometheus text exposition of the counters in app/metrics.py.
+    """
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return Response(content=render(), media_type=CONTENT_TYPE)
+
+
+def _require_profiling(x_profile_token: Optional[str] = Header(default=None)):
+    if not settings.PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    if not profiling.token_ok(x_profile_token):
+        raise HTTPException(status_code=403, detail="Invalid profiling token")
+
+
+@app.get(
+    "/admin/profiles",
+    include_in_schema=False,
+    dependencies=[Depends(_require_profiling)],
+)
+async def list_profiles():
+    """
+    Stored request profiles, newest first.
+    """
+    return await asyncio.to_thread(profiling.list_profiles)
+
+
+@app.get(
+    "/admin/profiles/{profile_id}",
+    include_in_schema=False,
+    dependencies=[Depends(_require_profiling)],
+)
+async def get_profile(profile_id: str):
+    record = await asyncio.to_thread(profiling.load_profile, profile_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return record
+
+
+@app.get(
+    "/admin/profiles/{profile_id}/collapsed",
+    include_in_schema=False,
+    dependencies=[Depends(_require_profiling)],
+)
+async def get_profile_collapsed(profile_id: str):
+    """
+    Collapsed stacks, for flamegraph.pl or speedscope.
+    """
+    record = await asyncio.to_thread(profiling.load_profile, profile_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return Response(content=record["collapsed"], media_type="text/plain")
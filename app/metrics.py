@@ -0,0 +1,301 @@
+# app/metrics.py
+"""
+Request instrumentation, exposed in Prometheus text format at GET /metrics.
+
+MetricsMiddleware times every request by route template and, through a
+context variable, collects what the request spent in each phase of the hot
+path: SQL (statement count and time, from engine events), the page cache,
+scraping and JSON encoding. Other modules report into it with `timed()`.
+
+No client library: counters and histograms are plain dicts keyed by label
+values, updated from the event loop thread without locks.
+"""
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30,
+)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250, 1000)
+
+# phases of a request reported separately; the rest of its time is "other"
+PHASES = ("db", "cache", "scrape", "serialize")
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _series(name: str, names: Sequence[str], values: Labels, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return f"{name}{{{','.join(pairs)}}}" if pairs else name
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, doc: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.doc = doc
+        self.labels = tuple(labels)
+        self._values: Dict[Labels, float] = defaultdict(float)
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        self._values[labels] += amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.doc}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in sorted(self._values.items()):
+            yield f"{_series(self.name, self.labels, labels)} {_number(value)}"
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        doc: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.doc = doc
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # per label set: [count per bucket (+Inf last)..., sum]
+        self._values: Dict[Labels, List[float]] = {}
+
+    def observe(self, value: float, *labels: str):
+        series = self._values.get(labels)
+        if series is None:
+            series = self._values[labels] = [0] * (len(self.buckets) + 2)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._values.get(labels)
+        return int(sum(series[:-1])) if series else 0
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.doc}"
+        yield f"# TYPE {self.name} histogram"
+        bounds = self.buckets + (float("inf"),)
+        for labels, series in sorted(self._values.items()):
+            cumulative = 0
+            for bound, n in zip(bounds, series):
+                cumulative += n
+                le = f'le="{_number(bound)}"'
+                name = _series(f"{self.name}_bucket", self.labels, labels, le)
+                yield f"{name} {cumulative}"
+            yield f"{_series(self.name + '_sum', self.labels, labels)} {series[-1]!r}"
+            yield f"{_series(self.name + '_count', self.labels, labels)} {cumulative}"
+
+
+class Collected:
+    """
+    Values read at scrape time from `collect()`, e.g. another module's
+    stats: {label values: value}.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        doc: str,
+        kind: str,
+        collect: Callable[[], Dict[Labels, float]],
+        labels: Sequence[str] = (),
+    ):
+        self.name = name
+        self.doc = doc
+        self.kind = kind
+        self.labels = tuple(labels)
+        self.collect = collect
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.doc}"
+        yield f"# TYPE {self.name} {self.kind}"
+        for labels, value in sorted(self.collect().items()):
+            yield f"{_series(self.name, self.labels, labels)} {_number(value)}"
+
+
+_registry: Dict[str, object] = {}
+
+
+def register(metric):
+    """
+    Add a metric to GET /metrics; registering a name twice keeps the first.
+    """
+    return _registry.setdefault(metric.name, metric)
+
+
+def render() -> str:
+    lines = []
+    for metric in _registry.values():
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+http_requests = register(
+    Counter(
+        "http_requests_total",
+        "HTTP requests by route template and status.",
+        ("method", "route", "status"),
+    )
+)
+http_duration = register(
+    Histogram(
+        "http_request_duration_seconds",
+        "HTTP request latency, until the last body byte is sent.",
+        ("method", "route"),
+    )
+)
+http_phase = register(
+    Histogram(
+        "http_request_phase_seconds",
+        "Time a request spent per phase (db, cache, scrape, serialize, other).",
+        ("route", "phase"),
+    )
+)
+http_statements = register(
+    Histogram(
+        "http_request_db_statements",
+        "SQL statements executed per request.",
+        ("route",),
+        buckets=COUNT_BUCKETS,
+    )
+)
+db_statements = register(
+    Counter("db_statements_total", "SQL statements executed.", ("engine",))
+)
+db_duration = register(
+    Histogram(
+        "db_statement_duration_seconds", "SQL statement latency.", ("engine",)
+    )
+)
+
+
+class RequestStats:
+    __slots__ = ("statements", "phases")
+
+    def __init__(self):
+        self.statements = 0
+        self.phases: Dict[str, float] = defaultdict(float)
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar(
+    "request_stats", default=None
+)
+
+
+def current() -> Optional[RequestStats]:
+    """
+    Stats of the request being handled, None outside a request.
+    """
+    return _current.get()
+
+
+@contextmanager
+def timed(phase: str):
+    """
+    Add the time spent in the block to the current request's `phase`.
+    """
+    stats = _current.get()
+    if stats is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.phases[phase] += time.perf_counter() - started
+
+
+def instrument_engine(engine: AsyncEngine, name: str):
+    """
+    Count and time every statement run through `engine`, globally and for
+    the current request.
+    """
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+    def after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["metrics_started"].pop()
+        db_statements.inc(name)
+        db_duration.observe(elapsed, name)
+        stats = _current.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.phases["db"] += elapsed
+
+    def failed(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("metrics_started"):
+            conn.info["metrics_started"].pop()
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before)
+    event.listen(engine.sync_engine, "after_cursor_execute", after)
+    event.listen(engine.sync_engine, "handle_error", failed)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency, status, SQL statements and phase
+    times per route template (unmatched paths share one label).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        status = "500"
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _current.reset(token)
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            http_requests.inc(method, path, status)
+            http_duration.observe(elapsed, method, path)
+            http_statements.observe(stats.statements, path)
+            accounted = 0.0
+            for phase in PHASES:
+                seconds = stats.phases.get(phase, 0.0)
+                accounted += seconds
+                http_phase.observe(seconds, path, phase)
+            http_phase.observe(max(0.0, elapsed - accounted), path, "other")
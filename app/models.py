@@ -5,8 +5,12 @@ from sqlalchemy import (
     Integer,
     Text,
     DateTime,
+    Float,
     ForeignKey,
     BigInteger,
+    Index,
+    LargeBinary,
+    UniqueConstraint,
     func,
 )
 from sqlalchemy.orm import relationship
@@ -24,7 +28,7 @@ class Page(Base):
     profile_image_url = Column(String(512), nullable=True)
     description = Column(Text, nullable=True)
     website = Column(String(512), nullable=True)
-    industry = Column(String(255), nullable=True)
+    industry = Column(String(255), nullable=True, index=True)
     follower_count = Column(Integer, nullable=True)
     headcount = Column(Integer, nullable=True)
     specialities = Column(Text, nullable=True)  # comma separated for simplicity
@@ -40,6 +44,34 @@ class Page(Base):
     followers = relationship(
         "PageFollower", back_populates="page", cascade="all, delete-orphan"
     )
+    fingerprints = relationship(
+        "PageFingerprint", back_populates="page", cascade="all, delete-orphan"
+    )
+    insight = relationship(
+        "PageInsight",
+        back_populates="page",
+        uselist=False,
+        cascade="all, delete-orphan",
+    )
+    follower_set = relationship(
+        "PageFollowerSet",
+        back_populates="page",
+        uselist=False,
+        cascade="all, delete-orphan",
+    )
+
+
+# GET /pages filters and keyset sorts. SQLite can't put NULLS LAST in an
+# index (and already sorts NULLs last on DESC); Postgres needs it spelled out.
+Index("ix_pages_name_id", Page.name, Page.id)
+Index("ix_pages_follower_count_id", Page.follower_count, Page.id).ddl_if(
+    dialect="sqlite"
+)
+Index(
+    "ix_pages_follower_count_id",
+    Page.follower_count.desc().nullslast(),
+    Page.id.desc(),
+).ddl_if(dialect="postgresql")
 
 
 class Post(Base):
@@ -61,6 +93,17 @@ class Post(Base):
     )
 
 
+# /posts and page details: newest posts of one page
+Index("ix_posts_page_id_posted_at", Post.page_id, Post.posted_at.desc()).ddl_if(
+    dialect="sqlite"
+)
+Index(
+    "ix_posts_page_id_posted_at",
+    Post.page_id,
+    Post.posted_at.desc().nullslast(),
+).ddl_if(dialect="postgresql")
+
+
 class SocialMediaUser(Base):
     __tablename__ = "social_media_users"
 
@@ -114,6 +157,9 @@ class Comment(Base):
 
 class PageFollower(Base):
     __tablename__ = "page_followers"
+    __table_args__ = (
+        Index("ux_page_followers_page_id_user_id", "page_id", "user_id", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     page_id = Column(Integer, ForeignKey("pages.id", ondelete="CASCADE"), nullable=False)
@@ -123,3 +169,93 @@ class PageFollower(Base):
 
     page = relationship("Page", back_populates="followers")
     user = relationship("SocialMediaUser", back_populates="followed_pages")
+
+
+class PageFingerprint(Base):
+    __tablename__ = "page_fingerprints"
+    __table_args__ = (UniqueConstraint("page_id", "section"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    page_id = Column(Integer, ForeignKey("pages.id", ondelete="CASCADE"), nullable=False)
+    section = Column(String(32), nullable=False)  # page / posts / followers
+    content_hash = Column(String(64), nullable=False)
+    changed_at = Column(DateTime(timezone=True), server_default=func.now())
+    checked_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    page = relationship("Page", back_populates="fingerprints")
+
+
+# the scheduler's stalest-first scan
+Index(
+    "ix_page_fingerprints_section_checked_at",
+    PageFingerprint.section,
+    PageFingerprint.checked_at,
+)
+
+
+class SyncJob(Base):
+    __tablename__ = "sync_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    linkedin_page_id = Column(String(255), nullable=False, index=True)
+    status = Column(String(16), nullable=False, default="queued", index=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    worker_id = Column(String(64), nullable=True)
+    error = Column(Text, nullable=True)
+    result = Column(Text, nullable=True)  # JSON sync stats
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+
+# engagement aggregates of one page, kept up to date on every sync
+# (see app/insights.py)
+class PageInsight(Base):
+    __tablename__ = "page_insights"
+
+    id = Column(Integer, primary_key=True, index=True)
+    page_id = Column(
+        Integer,
+        ForeignKey("pages.id", ondelete="CASCADE"),
+        unique=True,
+        nullable=False,
+    )
+    post_count = Column(Integer, nullable=False, default=0)
+    total_likes = Column(BigInteger, nullable=False, default=0)
+    total_comments = Column(BigInteger, nullable=False, default=0)
+    total_shares = Column(BigInteger, nullable=False, default=0)
+    total_engagement = Column(BigInteger, nullable=False, default=0, index=True)
+    avg_likes = Column(Float, nullable=True)
+    avg_comments = Column(Float, nullable=True)
+    avg_shares = Column(Float, nullable=True)
+    avg_engagement = Column(Float, nullable=True, index=True)
+    # avg_engagement / follower_count
+    engagement_rate = Column(Float, nullable=True, index=True)
+    posts_per_week = Column(Float, nullable=True, index=True)
+    first_post_at = Column(DateTime(timezone=True), nullable=True)
+    last_post_at = Column(DateTime(timezone=True), nullable=True)
+    top_posts = Column(Text, nullable=True)  # JSON list, most engaging first
+    computed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    page = relationship("Page", back_populates="insight")
+
+
+# a page's follower ids as one sorted uint32 array, for audience overlap
+# (see app/audience.py); rebuilt whenever the page's followers sync
+class PageFollowerSet(Base):
+    __tablename__ = "page_follower_sets"
+
+    id = Column(Integer, primary_key=True, index=True)
+    page_id = Column(
+        Integer,
+        ForeignKey("pages.id", ondelete="CASCADE"),
+        unique=True,
+        nullable=False,
+    )
+    follower_count = Column(Integer, nullable=False, default=0)
+    user_ids = Column(LargeBinary, nullable=False)
+    updated_at = Column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+    page = relationship("Page", back_populates="follower_set")
@@ -0,0 +1,323 @@
+# app/profiling.py
+"""
+Opt-in profiling of single requests.
+
+With PROFILING_ENABLED and a PROFILING_TOKEN set, a request carrying the
+token (header X-Profile-Token, or ?profile=<token>) is run under a sampling
+profiler. A background thread wakes every PROFILING_INTERVAL_MS and records
+the stack of every task belonging to the request: the request's own task
+plus any task it spawned (coalesced syncs, background work), tracked through
+a context variable and the loop's task factory.
+
+- a task that is running gets the thread's live stack (on-CPU)
+- a suspended task gets its chain of awaits, ending in a "[waiting]" frame,
+  so time spent awaiting the DB or a scrape shows up where it is spent
+
+Profiles are stored as JSON (collapsed stacks for flamegraph.pl/speedscope
+plus a top-N function summary) in PROFILING_DIR, keeping only the newest
+PROFILING_MAX_STORED, and served by the /admin/profiles endpoints.
+"""
+import asyncio
+import hmac
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+import weakref
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+WAITING = "[waiting]"
+
+
+def _frame_label(code) -> str:
+    # first line, not the current one, so samples of a function aggregate
+    path = code.co_filename
+    for marker in ("site-packages/", "lib/python"):
+        if marker in path:
+            path = path.split(marker, 1)[1]
+            break
+    else:
+        path = os.path.relpath(path) if os.path.isabs(path) else path
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({path}:{code.co_firstlineno})"
+
+
+def _await_chain(task: asyncio.Task) -> List[Any]:
+    """
+    Frames of a task's coroutine chain (each coroutine and the one it is
+    awaiting), outermost first.
+    """
+    frames, awaitable = [], task.get_coro()
+    while awaitable is not None:
+        frame = (
+            getattr(awaitable, "cr_frame", None)
+            or getattr(awaitable, "ag_frame", None)
+            or getattr(awaitable, "gi_frame", None)
+        )
+        if frame is None:
+            # a Future (or the C iterator over one): nothing deeper to walk
+            break
+        frames.append(frame)
+        awaitable = (
+            getattr(awaitable, "cr_await", None)
+            or getattr(awaitable, "ag_await", None)
+            or getattr(awaitable, "gi_yieldfrom", None)
+        )
+    return frames
+
+
+def _thread_stack(frame) -> List[Any]:
+    stack = []
+    while frame is not None:
+        stack.append(frame)
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+class Session:
+    """
+    One profiled request: its tasks and the stack samples taken so far.
+    """
+
+    def __init__(self, interval: float, task: asyncio.Task):
+        self.id = f"{int(time.time() * 1000):013d}-{uuid.uuid4().hex[:8]}"
+        self.interval = interval
+        self.thread_id = threading.get_ident()
+        self.tasks: "weakref.WeakSet[asyncio.Task]" = weakref.WeakSet([task])
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.started_at = datetime.now(timezone.utc)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name=f"profiler-{self.id}", daemon=True
+        )
+
+    def start(self):
+        self._thread.start()
+
+    async def stop(self):
+        self._stop.set()
+        # the sampler may be mid-sample: wait for it off the event loop
+        await asyncio.get_running_loop().run_in_executor(None, self._thread.join)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self._sample()
+            except RuntimeError:
+                # a task set changed under us; skip this tick
+                pass
+
+    def _sample(self):
+        current = sys._current_frames().get(self.thread_id)
+        self.samples += 1
+        for task in list(self.tasks):
+            if task.done():
+                continue
+            chain = _await_chain(task)
+            # a task's coroutine is "running" only while the loop steps it
+            running = getattr(task.get_coro(), "cr_running", False)
+            if running and current is not None:
+                stack = _thread_stack(current)
+                if chain and chain[0] in stack:
+                    # drop the event loop frames below the task
+                    stack = stack[stack.index(chain[0]) :]
+                else:
+                    # e.g. inside a greenlet (SQLAlchemy's sync-over-async)
+                    stack = chain + stack
+                labels = [_frame_label(f.f_code) for f in stack]
+            else:
+                labels = [_frame_label(f.f_code) for f in chain] + [WAITING]
+            self.stacks[";".join([task.get_name()] + labels)] += 1
+
+    def summary(self, top_n: int) -> List[Dict[str, Any]]:
+        """
+        Functions by self samples (leaf of the stack), with inclusive counts.
+        Time spent suspended is listed separately, with waiting=True.
+        """
+        own, total = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")[1:]
+            # (function, waiting): awaits count for the function awaiting
+            if frames[-1] == WAITING and len(frames) > 1:
+                own[frames[-2], True] += count
+            else:
+                own[frames[-1], False] += count
+            for frame in set(frames):
+                total[frame] += count
+        every = sum(self.stacks.values()) or 1
+        return [
+            {
+                "function": frame,
+                "waiting": waiting,
+                "self": count,
+                "total": total[frame],
+                "self_pct": round(100 * count / every, 1),
+                "total_pct": round(100 * total[frame] / every, 1),
+            }
+            for (frame, waiting), count in own.most_common(top_n)
+        ]
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.items())
+
+
+_session: ContextVar[Optional[Session]] = ContextVar("profile_session", default=None)
+_active = 0
+
+
+def _task_factory(previous):
+    def factory(loop, coro, **kwargs):
+        if previous is not None:
+            task = previous(loop, coro, **kwargs)
+        else:
+            task = asyncio.Task(coro, loop=loop, **kwargs)
+        session = _session.get()
+        if session is not None:
+            session.tasks.add(task)
+        return task
+
+    factory.profiling = True
+    return factory
+
+
+def _install_task_factory(loop: asyncio.AbstractEventLoop):
+    previous = loop.get_task_factory()
+    if not getattr(previous, "profiling", False):
+        loop.set_task_factory(_task_factory(previous))
+
+
+def token_ok(token: Optional[str]) -> bool:
+    expected = settings.PROFILING_TOKEN
+    if not (settings.PROFILING_ENABLED and expected and token):
+        return False
+    return hmac.compare_digest(token.encode(), expected.encode())
+
+
+def _request_token(scope) -> Optional[str]:
+    for name, value in scope["headers"]:
+        if name == b"x-profile-token":
+            return value.decode("latin-1")
+    query = scope.get("query_string", b"")
+    if b"profile=" in query:
+        values = parse_qs(query.decode("latin-1")).get("profile")
+        return values[0] if values else None
+    return None
+
+
+def _store(record: Dict[str, Any]):
+    directory = Path(settings.PROFILING_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{record['id']}.json"
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(record))
+    os.replace(tmp, path)
+    # ids sort by time: drop the oldest past the limit
+    stored = sorted(directory.glob("*.json"))
+    for old in stored[: max(0, len(stored) - settings.PROFILING_MAX_STORED)]:
+        old.unlink(missing_ok=True)
+
+
+def _valid_id(profile_id: str) -> bool:
+    return Path(profile_id).name == profile_id and not profile_id.startswith(".")
+
+
+def list_profiles() -> List[Dict[str, Any]]:
+    """
+    Metadata of the stored profiles, newest first.
+    """
+    directory = Path(settings.PROFILING_DIR)
+    profiles = []
+    for path in sorted(directory.glob("*.json"), reverse=True):
+        try:
+            record = json.loads(path.read_text())
+            profiles.append(record["meta"] | {"id": record["id"]})
+        except (OSError, ValueError, KeyError, TypeError):
+            # truncated, or not a profile of ours
+            logger.warning("skipping unreadable profile %s", path, exc_info=True)
+    return profiles
+
+
+def load_profile(profile_id: str) -> Optional[Dict[str, Any]]:
+    if not _valid_id(profile_id):
+        return None
+    try:
+        path = Path(settings.PROFILING_DIR) / f"{profile_id}.json"
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling requests that carry the profiling token.
+    Adds an X-Profile-Id response header naming the stored profile.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        global _active
+        if (
+            scope["type"] != "http"
+            # the admin endpoints take the same token
+            or scope["path"].startswith("/admin/profiles")
+            or _active >= settings.PROFILING_MAX_CONCURRENT
+            or not token_ok(_request_token(scope))
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        _install_task_factory(asyncio.get_running_loop())
+        session = Session(settings.PROFILING_INTERVAL_MS / 1000, asyncio.current_task())
+        token = _session.set(session)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", session.id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        _active += 1
+        started = time.perf_counter()
+        session.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            await session.stop()
+            _active -= 1
+            _session.reset(token)
+            route = scope.get("route")
+            record = {
+                "id": session.id,
+                "meta": {
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "route": getattr(route, "path", None),
+                    "status": status,
+                    "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+                    "interval_ms": settings.PROFILING_INTERVAL_MS,
+                    "samples": session.samples,
+                    "started_at": session.started_at.isoformat(),
+                },
+                "top": session.summary(settings.PROFILING_TOP_N),
+                "collapsed": session.collapsed(),
+            }
+            await asyncio.to_thread(_store, record)
@@ -0,0 +1,31 @@
+# app/ratelimit.py
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    Global rate limit: `rate_per_minute` tokens refill continuously, at most
+    `capacity` can be saved up for a burst.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: float):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        refill = (now - self._updated) * self.rate
+        self.tokens = min(self.capacity, self.tokens + refill)
+        self._updated = now
+
+    async def acquire(self):
+        async with self._lock:
+            self._refill()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
@@ -0,0 +1,226 @@
+# app/scheduler.py
+import asyncio
+import logging
+import random
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple
+from . import crud, sync
+from .config import settings
+from .database import AsyncReadSessionLocal, AsyncSessionLocal
+from .ratelimit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+class RefreshScheduler:
+    """
+    Keeps pages fresh without waiting for clients to call /sync.
+
+    Every `interval` seconds a dispatcher picks the stalest pages from the DB
+    plus the most-read stale pages, scores them by staleness and read count,
+    and queues them for a fixed pool of async workers. Workers share one
+    scrapes-per-minute budget and refresh through sync.sync_page, so they
+    coalesce with client syncs of the same page. Pages whose refresh fails
+    are skipped for a jittered, exponentially growing backoff; the stalest
+    scan reads past them, so failing pages never starve the others.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        scrapes_per_minute: float,
+        interval_seconds: float,
+        batch_size: int,
+        stale_after_seconds: float,
+        backoff_base_seconds: float,
+        backoff_max_seconds: float,
+        max_tracked_reads: int = 10_000,
+    ):
+        self.workers = workers
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self.stale_after_seconds = stale_after_seconds
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.max_tracked_reads = max_tracked_reads
+        self.budget = TokenBucket(scrapes_per_minute, capacity=max(1, workers))
+
+        self._queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self._queued: Set[str] = set()
+        self._reads: Counter = Counter()
+        # page_id -> (consecutive failures, monotonic time it may run again)
+        self._backoff: Dict[str, Tuple[int, float]] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._started_at: Optional[float] = None
+        self._busy = 0
+        self._busy_seconds = 0.0
+        self.refreshed = 0
+        self.failed = 0
+
+    @classmethod
+    def from_settings(cls) -> "RefreshScheduler":
+        return cls(
+            workers=settings.SCHEDULER_WORKERS,
+            scrapes_per_minute=settings.SCHEDULER_SCRAPES_PER_MINUTE,
+            interval_seconds=settings.SCHEDULER_INTERVAL_SECONDS,
+            batch_size=settings.SCHEDULER_BATCH_SIZE,
+            stale_after_seconds=settings.SCHEDULER_STALE_AFTER_SECONDS,
+            backoff_base_seconds=settings.SCHEDULER_BACKOFF_BASE_SECONDS,
+            backoff_max_seconds=settings.SCHEDULER_BACKOFF_MAX_SECONDS,
+            max_tracked_reads=settings.SCHEDULER_MAX_TRACKED_READS,
+        )
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def record_read(self, page_id: str):
+        # only the dispatcher consumes (and decays) the counts
+        if not self.running:
+            return
+        self._reads[page_id] += 1
+        if len(self._reads) > self.max_tracked_reads:
+            self._decay_reads()
+
+    def _decay_reads(self):
+        """
+        Halve read counts so "most read" reflects recent traffic, and keep
+        the dict within max_tracked_reads even if the dispatcher stalls.
+        """
+        reads = Counter({pid: n // 2 for pid, n in self._reads.items() if n > 1})
+        if len(reads) > self.max_tracked_reads // 2:
+            reads = Counter(dict(reads.most_common(self.max_tracked_reads // 2)))
+        self._reads = reads
+
+    async def start(self):
+        if self.running:
+            return
+        self._started_at = time.monotonic()
+        self._tasks = [asyncio.create_task(self._dispatch_loop())]
+        self._tasks += [
+            asyncio.create_task(self._worker()) for _ in range(self.workers)
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._reads.clear()
+
+    def status(self) -> dict:
+        uptime = time.monotonic() - self._started_at if self._started_at else 0.0
+        capacity_seconds = uptime * self.workers
+        return {
+            "running": self.running,
+            "queue_depth": self._queue.qsize(),
+            "workers": self.workers,
+            "busy_workers": self._busy,
+            "utilization": (
+                self._busy_seconds / capacity_seconds if capacity_seconds else 0.0
+            ),
+            "refreshed": self.refreshed,
+            "failed": self.failed,
+            "backing_off": sum(
+                1 for _, until in self._backoff.values() if until > time.monotonic()
+            ),
+            "budget_tokens": round(self.budget.tokens, 2),
+        }
+
+    async def dispatch_once(self) -> int:
+        """
+        Queue the current refresh candidates; returns how many were queued.
+        """
+        now = time.monotonic()
+        self._forget_backoffs(now)
+        backing_off = {
+            pid for pid, (_, until) in self._backoff.items() if until > now
+        }
+        hot = [pid for pid, _ in self._reads.most_common(self.batch_size)]
+        async with AsyncReadSessionLocal() as db:
+            ages = dict(
+                await crud.get_stalest_pages(
+                    db, self.batch_size, skip=self._queued | backing_off
+                )
+            )
+            ages.update(await crud.get_page_ages(db, hot))
+
+        queued = 0
+        for page_id, age in ages.items():
+            if age < self.stale_after_seconds or page_id in self._queued:
+                continue
+            _, until = self._backoff.get(page_id, (0, 0.0))
+            if until > now:
+                continue
+            # stale and popular first
+            priority = -age * (1 + self._reads.get(page_id, 0))
+            self._queued.add(page_id)
+            self._queue.put_nowait((priority, page_id))
+            queued += 1
+
+        self._decay_reads()
+        return queued
+
+    async def _dispatch_loop(self):
+        try:
+            async with AsyncSessionLocal() as db:
+                added = await crud.add_missing_fingerprints(db)
+                await db.commit()
+            if added:
+                logger.info("added fingerprints for %d unsynced pages", added)
+        except Exception:
+            logger.exception("fingerprint backfill failed")
+        while True:
+            try:
+                await self.dispatch_once()
+            except Exception:
+                logger.exception("refresh dispatch failed")
+            await asyncio.sleep(self.interval_seconds)
+
+    async def _worker(self):
+        while True:
+            _, page_id = await self._queue.get()
+            try:
+                await self.budget.acquire()
+                self._busy += 1
+                started = time.monotonic()
+                try:
+                    await sync.sync_page(page_id)
+                finally:
+                    self._busy -= 1
+                    self._busy_seconds += time.monotonic() - started
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("scheduled refresh of %s failed", page_id)
+                self.failed += 1
+                self._back_off(page_id)
+            else:
+                self.refreshed += 1
+                self._backoff.pop(page_id, None)
+            finally:
+                self._queued.discard(page_id)
+
+    def _forget_backoffs(self, now: float):
+        # a page still not retried backoff_max after its backoff ran out is
+        # fresh again or gone: drop it rather than keep it forever
+        expired = now - self.backoff_max_seconds
+        self._backoff = {
+            pid: entry
+            for pid, entry in self._backoff.items()
+            if entry[1] > expired or pid in self._queued
+        }
+
+    def _back_off(self, page_id: str):
+        failures = self._backoff.get(page_id, (0, 0.0))[0] + 1
+        delay = min(
+            self.backoff_max_seconds,
+            self.backoff_base_seconds * 2 ** (failures - 1),
+        )
+        # jitter so pages that failed together don't retry together
+        delay *= random.uniform(0.5, 1.5)
+        self._backoff[page_id] = (failures, time.monotonic() + delay)
+
+
+scheduler = RefreshScheduler.from_settings()
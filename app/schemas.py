@@ -1,7 +1,8 @@
 # app/schemas.py
+import json
 from datetime import datetime
-from typing import Optional, List
-from pydantic import BaseModel
+from typing import Optional, List, Dict
+from pydantic import BaseModel, Field, field_validator
 
 
 class PostBase(BaseModel):
@@ -43,6 +44,37 @@ class Page(PageBase):
         from_attributes = True
 
 
+class PageSync(Page):
+    # rows touched per section, e.g. {"followers": {"users_inserted": 3, ...}}
+    sync: Dict[str, Dict[str, int]] = {}
+
+
+class SyncJob(BaseModel):
+    id: int
+    page_id: str = Field(validation_alias="linkedin_page_id")
+    status: str  # queued / running / succeeded / failed
+    attempts: int
+    error: Optional[str] = None
+    sync: Optional[Dict[str, Dict[str, int]]] = Field(
+        default=None, validation_alias="result"
+    )
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    @field_validator("sync", mode="before")
+    @classmethod
+    def _decode_result(cls, value):
+        return json.loads(value) if isinstance(value, str) else value
+
+    class Config:
+        from_attributes = True
+
+
+class BatchSyncRequest(BaseModel):
+    page_ids: List[str] = Field(min_length=1)
+
+
 class PageListItem(BaseModel):
     id: int
     linkedin_page_id: str
@@ -55,10 +87,12 @@ class PageListItem(BaseModel):
 
 
 class PaginatedPages(BaseModel):
-    total: int
+    total: Optional[int]  # None with count=none
     page: int
     limit: int
     items: List[PageListItem]
+    # pass as ?cursor= to get the rows after this page; None on the last page
+    next_cursor: Optional[str] = None
 
 
 class FollowerUser(BaseModel):
@@ -69,3 +103,79 @@ class FollowerUser(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class TopPost(BaseModel):
+    linkedin_post_id: str
+    content_text: Optional[str] = None
+    like_count: Optional[int] = None
+    comment_count: Optional[int] = None
+    share_count: Optional[int] = None
+    engagement: int  # likes + comments + shares
+    posted_at: Optional[datetime] = None
+
+
+class PageInsights(BaseModel):
+    page_id: str
+    follower_count: Optional[int] = None
+    post_count: int
+    total_likes: int
+    total_comments: int
+    total_shares: int
+    total_engagement: int
+    avg_likes: Optional[float] = None
+    avg_comments: Optional[float] = None
+    avg_shares: Optional[float] = None
+    avg_engagement: Optional[float] = None
+    # average engagement per post / follower_count
+    engagement_rate: Optional[float] = None
+    posts_per_week: Optional[float] = None
+    first_post_at: Optional[datetime] = None
+    last_post_at: Optional[datetime] = None
+    top_posts: List[TopPost] = []
+    computed_at: Optional[datetime] = None
+
+    @field_validator("top_posts", mode="before")
+    @classmethod
+    def _decode_top_posts(cls, value):
+        if value is None:
+            return []
+        return json.loads(value) if isinstance(value, str) else value
+
+    class Config:
+        from_attributes = True
+
+
+class AudienceOverlap(BaseModel):
+    page_id: str
+    other_page_id: str
+    followers: int
+    other_followers: int
+    shared_followers: int
+    # shared / followers of either page
+    jaccard: float
+
+
+class SimilarAudience(BaseModel):
+    page_id: str
+    followers: int
+    shared_followers: int
+    jaccard: float
+
+
+class SimilarAudiences(BaseModel):
+    page_id: str
+    followers: int
+    similar: List[SimilarAudience]
+
+
+class SchedulerStatus(BaseModel):
+    running: bool
+    queue_depth: int
+    workers: int
+    busy_workers: int
+    utilization: float
+    refreshed: int
+    failed: int
+    backing_off: int
+    budget_tokens: float
@@ -1,55 +1,505 @@
 # app/scraper.py
+"""
+Scraper engine: turns a page slug into a scrape payload
+({"page": {...}, "posts": [...], "followers": [...]}).
+
+Fetching is pluggable (SCRAPER_BACKEND):
+- demo:       synthesized data, no I/O (default)
+- fixture:    local files, SCRAPER_FIXTURE_DIR/<page_id>.json (a payload) or
+              <page_id>.html (parsed like a live page); for offline runs and
+              benchmarks
+- http:       one shared httpx.AsyncClient for every scrape
+- playwright: one browser with a pool of SCRAPER_BROWSER_CONTEXTS reusable
+              contexts, handed out per scrape
+
+Every backend runs behind the same limits: at most SCRAPER_MAX_PER_HOST
+scrapes per host at once, a SCRAPER_REQUESTS_PER_MINUTE token bucket, a
+per-attempt timeout and SCRAPER_RETRIES retries with jittered exponential
+backoff. Missing pages fail straight away with PageNotFound.
+"""
+import asyncio
+import json
+import logging
+import random
+import time
+from collections import defaultdict
 from datetime import datetime, timedelta
-from typing import Any, Dict, List
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+from . import metrics
+from .config import settings
+from .ratelimit import TokenBucket
 
+logger = logging.getLogger(__name__)
 
-async def scrape_linkedin_page(page_id: str) -> Dict[str, Any]:
+
+class ScrapeError(Exception):
     """
-    Dummy scraper.
-    Replace with Playwright-based scraping that logs into LinkedIn and extracts real data.
+    A scrape failed; worth retrying.
     """
-    # Example: synthesize data for demo
+
+
+class PageNotFound(ScrapeError):
+    """
+    The page doesn't exist; retrying won't help.
+    """
+
+
+def page_url(page_id: str) -> str:
+    return settings.SCRAPER_BASE_URL.rstrip("/") + f"/{page_id}"
+
+
+class _CompanyPageParser(HTMLParser):
+    # collects <meta property="og:*"> tags and JSON-LD blocks
+    def __init__(self):
+        super().__init__()
+        self.meta: Dict[str, str] = {}
+        self.json_ld: List[Any] = []
+        self._in_json_ld = False
+        self._buffer: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "meta":
+            key = attrs.get("property") or attrs.get("name")
+            if key and attrs.get("content") is not None:
+                self.meta[key] = attrs["content"]
+        elif tag == "script" and attrs.get("type") == "application/ld+json":
+            self._in_json_ld = True
+            self._buffer = []
+
+    def handle_data(self, data):
+        if self._in_json_ld:
+            self._buffer.append(data)
+
+    def handle_endtag(self, tag):
+        if tag == "script" and self._in_json_ld:
+            self._in_json_ld = False
+            try:
+                self.json_ld.append(json.loads("".join(self._buffer)))
+            except ValueError:
+                pass
+
+
+def parse_company_page(html: str, page_id: str) -> Dict[str, Any]:
+    """
+    Scrape payload from a public company page: Open Graph tags plus the
+    schema.org Organization JSON-LD block, when present. Posts and
+    followers need a logged-in session and are left empty here.
+    """
+    parser = _CompanyPageParser()
+    parser.feed(html)
+    org: Dict[str, Any] = {}
+    for block in parser.json_ld:
+        for item in block if isinstance(block, list) else [block]:
+            if isinstance(item, dict) and item.get("@type") == "Organization":
+                org = item
+    meta = parser.meta
+
+    name = org.get("name") or meta.get("og:title")
+    if not name:
+        raise ScrapeError(f"no company data found for {page_id}")
+    employees = org.get("numberOfEmployees") or {}
+    website = org.get("sameAs")
+    if isinstance(website, list):
+        website = website[0] if website else None
+    followers = (org.get("interactionStatistic") or {}).get("userInteractionCount")
     page = {
         "linkedin_page_id": page_id,
-        "linkedin_platform_id": "1234567890",
-        "name": f"Demo Company {page_id}",
-        "url": f"https://www.linkedin.com/company/{page_id}",
-        "profile_image_url": "https://example.com/profile.png",
-        "description": "Demo company description for testing.",
-        "website": "https://example.com",
-        "industry": "Software",
-        "follower_count": 25000,
-        "headcount": 120,
-        "specialities": "SaaS,Cloud,AI",
+        "name": name,
+        "url": meta.get("og:url") or page_url(page_id),
+        "profile_image_url": (org.get("logo") or {}).get("contentUrl")
+        or meta.get("og:image"),
+        "description": org.get("description") or meta.get("og:description"),
+        "website": website,
+        "industry": org.get("industry"),
+        "follower_count": followers,
+        "headcount": employees.get("value") if isinstance(employees, dict) else None,
+        "specialities": ",".join(org.get("knowsAbout") or []) or None,
     }
+    return {"page": page, "posts": [], "followers": []}
+
+
+class DemoBackend:
+    """
+    Synthesized data for demos and tests; no network.
+    """
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def scrape(self, page_id: str) -> Dict[str, Any]:
+        page = {
+            "linkedin_page_id": page_id,
+            "linkedin_platform_id": "1234567890",
+            "name": f"Demo Company {page_id}",
+            "url": f"https://www.linkedin.com/company/{page_id}",
+            "profile_image_url": "https://example.com/profile.png",
+            "description": "Demo company description for testing.",
+            "website": "https://example.com",
+            "industry": "Software",
+            "follower_count": 25000,
+            "headcount": 120,
+            "specialities": "SaaS,Cloud,AI",
+        }
+
+        # day granularity keeps repeated demo scrapes identical (see fingerprint.py)
+        now = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        posts: List[Dict[str, Any]] = []
+        for i in range(1, 6):
+            posts.append(
+                {
+                    "linkedin_post_id": f"{page_id}-post-{i}",
+                    "content_text": f"Demo post {i} for {page_id}",
+                    "media_url": None,
+                    "like_count": 10 * i,
+                    "comment_count": 2 * i,
+                    "share_count": i,
+                    "posted_at": now - timedelta(days=i),
+                }
+            )
+
+        followers: List[Dict[str, Any]] = []
+        for i in range(1, 6):
+            followers.append(
+                {
+                    "linkedin_user_id": f"user-{i}",
+                    "name": f"Follower User {i}",
+                    "headline": "Software Engineer",
+                }
+            )
+
+        return {
+            "page": page,
+            "posts": posts,
+            "followers": followers,
+        }
+
+
+class FixtureBackend:
+    """
+    Reads <directory>/<page_id>.json (a ready payload) or <page_id>.html
+    (parsed with parse_company_page). With `fallback` set, pages without a
+    fixture are delegated to it instead of raising PageNotFound.
+    """
+
+    def __init__(self, directory: str, fallback=None):
+        self.directory = Path(directory)
+        self.fallback = fallback
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def scrape(self, page_id: str) -> Dict[str, Any]:
+        if Path(page_id).name != page_id:
+            raise PageNotFound(f"invalid page id {page_id!r}")
+        for suffix in (".json", ".html"):
+            path = self.directory / f"{page_id}{suffix}"
+            if path.is_file():
+                text = await asyncio.to_thread(path.read_text, encoding="utf-8")
+                if suffix == ".json":
+                    return _with_dates(json.loads(text))
+                return parse_company_page(text, page_id)
+        if self.fallback is not None:
+            return await self.fallback.scrape(page_id)
+        raise PageNotFound(f"no fixture for {page_id} in {self.directory}")
+
+
+def _with_dates(payload: Dict[str, Any]) -> Dict[str, Any]:
+    # JSON fixtures carry ISO strings; the DB layer expects datetimes
+    for post in payload.get("posts", []):
+        if isinstance(post.get("posted_at"), str):
+            post["posted_at"] = datetime.fromisoformat(post["posted_at"])
+    return payload
+
+
+def _check_status(status: int, url: str):
+    if status == 404:
+        raise PageNotFound(f"{url} returned 404")
+    if status >= 400:
+        raise ScrapeError(f"{url} returned {status}")
 
-    now = datetime.utcnow()
-    posts: List[Dict[str, Any]] = []
-    for i in range(1, 6):
-        posts.append(
-            {
-                "linkedin_post_id": f"{page_id}-post-{i}",
-                "content_text": f"Demo post {i} for {page_id}",
-                "media_url": None,
-                "like_count": 10 * i,
-                "comment_count": 2 * i,
-                "share_count": i,
-                "posted_at": now - timedelta(days=i),
-            }
+
+class HttpBackend:
+    """
+    Plain HTTP fetches through one shared httpx.AsyncClient (connection
+    pooling and keep-alive across scrapes).
+    """
+
+    def __init__(
+        self, user_agent: str, timeout_seconds: float, max_connections: int
+    ):
+        self.user_agent = user_agent
+        self.timeout_seconds = timeout_seconds
+        self.max_connections = max_connections
+        self._client = None
+
+    async def start(self):
+        import httpx
+
+        self._client = httpx.AsyncClient(
+            headers={"User-Agent": self.user_agent},
+            timeout=self.timeout_seconds,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=self.max_connections),
+        )
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def scrape(self, page_id: str) -> Dict[str, Any]:
+        import httpx
+
+        url = page_url(page_id)
+        try:
+            res = await self._client.get(url)
+        except httpx.HTTPError as exc:
+            raise ScrapeError(f"{url}: {exc}") from exc
+        _check_status(res.status_code, url)
+        return parse_company_page(res.text, page_id)
+
+
+class PlaywrightBackend:
+    """
+    One headless browser and a fixed pool of browser contexts; each scrape
+    borrows a context, opens a tab, and gives the context back. Launching a
+    browser per scrape costs seconds, a new tab milliseconds.
+    """
+
+    def __init__(self, contexts: int, user_agent: str, timeout_seconds: float):
+        self.contexts = contexts
+        self.user_agent = user_agent
+        self.timeout_seconds = timeout_seconds
+        self._playwright = None
+        self._browser = None
+        self._pool: Optional[asyncio.Queue] = None
+
+    async def start(self):
+        try:
+            from playwright.async_api import async_playwright
+        except ImportError as exc:
+            raise RuntimeError(
+                "SCRAPER_BACKEND=playwright needs `pip install playwright` "
+                "and `playwright install chromium`"
+            ) from exc
+        self._playwright = await async_playwright().start()
+        self._browser = await self._playwright.chromium.launch(headless=True)
+        self._pool = asyncio.Queue()
+        for _ in range(self.contexts):
+            context = await self._browser.new_context(user_agent=self.user_agent)
+            self._pool.put_nowait(context)
+
+    async def close(self):
+        if self._browser is not None:
+            await self._browser.close()
+            self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    async def scrape(self, page_id: str) -> Dict[str, Any]:
+        from playwright.async_api import Error as PlaywrightError
+
+        url = page_url(page_id)
+        context = await self._pool.get()
+        try:
+            tab = await context.new_page()
+            try:
+                res = await tab.goto(
+                    url,
+                    timeout=self.timeout_seconds * 1000,
+                    wait_until="domcontentloaded",
+                )
+                if res is not None:
+                    _check_status(res.status, url)
+                html = await tab.content()
+            finally:
+                await tab.close()
+        except PlaywrightError as exc:
+            raise ScrapeError(f"{url}: {exc}") from exc
+        finally:
+            self._pool.put_nowait(context)
+        return parse_company_page(html, page_id)
+
+
+class ScraperEngine:
+    """
+    Runs a backend's scrapes under per-host concurrency caps, a shared
+    requests-per-minute budget, a per-attempt timeout and retries.
+    The backend (built from SCRAPER_BACKEND when None) is created and started
+    on first use, so no browser or HTTP client is loaded until a scrape
+    happens, and reused until close().
+    """
+
+    def __init__(
+        self,
+        backend: Optional[Any],
+        max_per_host: int,
+        requests_per_minute: float,
+        retries: int,
+        backoff_base_seconds: float,
+        timeout_seconds: float,
+    ):
+        self.backend = backend
+        self.max_per_host = max_per_host
+        self.retries = retries
+        self.backoff_base_seconds = backoff_base_seconds
+        self.timeout_seconds = timeout_seconds
+        self.budget = None
+        if requests_per_minute > 0:
+            self.budget = TokenBucket(
+                requests_per_minute, capacity=max(1, max_per_host)
+            )
+        self._hosts: Dict[str, asyncio.Semaphore] = defaultdict(
+            lambda: asyncio.Semaphore(self.max_per_host)
         )
+        self._started = False
+        self._start_lock = asyncio.Lock()
+        self.scrapes = 0
+        self.failures = 0
+        self.retried = 0
 
-    followers: List[Dict[str, Any]] = []
-    for i in range(1, 6):
-        followers.append(
-            {
-                "linkedin_user_id": f"user-{i}",
-                "name": f"Follower User {i}",
-                "headline": "Software Engineer",
-            }
+    @classmethod
+    def from_settings(cls) -> "ScraperEngine":
+        return cls(
+            backend=None,
+            max_per_host=settings.SCRAPER_MAX_PER_HOST,
+            requests_per_minute=settings.SCRAPER_REQUESTS_PER_MINUTE,
+            retries=settings.SCRAPER_RETRIES,
+            backoff_base_seconds=settings.SCRAPER_BACKOFF_BASE_SECONDS,
+            timeout_seconds=settings.SCRAPER_TIMEOUT_SECONDS,
         )
 
-    return {
-        "page": page,
-        "posts": posts,
-        "followers": followers,
-    }
+    async def start(self):
+        async with self._start_lock:
+            if not self._started:
+                if self.backend is None:
+                    self.backend = make_backend(settings.SCRAPER_BACKEND)
+                await self.backend.start()
+                self._started = True
+
+    async def close(self):
+        async with self._start_lock:
+            if self._started:
+                await self.backend.close()
+                self._started = False
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "scrapes": self.scrapes,
+            "failures": self.failures,
+            "retried": self.retried,
+        }
+
+    async def scrape(self, page_id: str) -> Dict[str, Any]:
+        await self.start()
+        host = urlsplit(page_url(page_id)).hostname or ""
+        for attempt in range(self.retries + 1):
+            # the host slot is held per attempt, not through the retry sleep,
+            # so a page that is backing off doesn't hold up others on its host
+            async with self._hosts[host]:
+                if self.budget is not None:
+                    await self.budget.acquire()
+                try:
+                    payload = await asyncio.wait_for(
+                        self.backend.scrape(page_id), self.timeout_seconds
+                    )
+                except PageNotFound:
+                    self.failures += 1
+                    raise
+                except (ScrapeError, asyncio.TimeoutError) as exc:
+                    if attempt == self.retries:
+                        self.failures += 1
+                        if isinstance(exc, asyncio.TimeoutError):
+                            raise ScrapeError(
+                                f"scraping {page_id} timed out"
+                            ) from exc
+                        raise
+                    error = exc
+                else:
+                    self.scrapes += 1
+                    return payload
+            self.retried += 1
+            delay = self.backoff_base_seconds * 2**attempt
+            # jitter so scrapes that failed together don't retry together
+            delay *= random.uniform(0.5, 1.5)
+            logger.warning(
+                "scrape of %s failed (%s), retrying in %.1fs",
+                page_id,
+                error,
+                delay,
+            )
+            await asyncio.sleep(delay)
+
+
+def make_backend(name: str):
+    if name == "demo":
+        return DemoBackend()
+    if name == "fixture":
+        return FixtureBackend(settings.SCRAPER_FIXTURE_DIR)
+    if name == "http":
+        return HttpBackend(
+            settings.SCRAPER_USER_AGENT,
+            settings.SCRAPER_TIMEOUT_SECONDS,
+            max_connections=settings.SCRAPER_MAX_PER_HOST,
+        )
+    if name == "playwright":
+        return PlaywrightBackend(
+            settings.SCRAPER_BROWSER_CONTEXTS,
+            settings.SCRAPER_USER_AGENT,
+            settings.SCRAPER_TIMEOUT_SECONDS,
+        )
+    raise ValueError(f"unknown SCRAPER_BACKEND {name!r}")
+
+
+scraper_engine = ScraperEngine.from_settings()
+
+scrape_duration = metrics.register(
+    metrics.Histogram(
+        "scrape_duration_seconds",
+        "Page scrapes (retries included) by outcome.",
+        ("outcome",),
+    )
+)
+metrics.register(
+    metrics.Collected(
+        "scrape_retries_total",
+        "Scrape attempts retried after a failure.",
+        "counter",
+        lambda: {(): scraper_engine.retried},
+    )
+)
+
+
+def _outcome(exc: Exception) -> str:
+    if isinstance(exc, PageNotFound):
+        return "not_found"
+    if isinstance(exc.__cause__, asyncio.TimeoutError):
+        return "timeout"
+    return "error"
+
+
+async def scrape_linkedin_page(page_id: str) -> Dict[str, Any]:
+    """
+    Scrape one page through the shared engine (see module docstring).
+    """
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        with metrics.timed("scrape"):
+            return await scraper_engine.scrape(page_id)
+    except Exception as exc:
+        outcome = _outcome(exc)
+        raise
+    finally:
+        scrape_duration.observe(time.perf_counter() - started, outcome)
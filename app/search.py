@@ -0,0 +1,217 @@
+# app/search.py
+"""
+Indexed full-text search over page name, description and specialities.
+
+SQLite: an FTS5 table `pages_fts` (rowid = pages.id), ranked with bm25 and
+kept in sync by index_page, which create_or_update_page_from_scrape calls
+(index_pages after bulk loads).
+Postgres: GIN indexes on a tsvector expression and on name (pg_trgm), ranked
+with ts_rank + trigram similarity. Expression indexes follow the table, so
+there is nothing to sync by hand.
+Anywhere else (or SQLite built without FTS5) it falls back to ILIKE scans.
+"""
+import logging
+import re
+from typing import List, Optional, Tuple
+from sqlalchemy import (
+    Float,
+    and_,
+    bindparam,
+    cast,
+    column,
+    false,
+    func,
+    literal_column,
+    or_,
+    select,
+    table,
+    text,
+)
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+from . import models
+
+logger = logging.getLogger(__name__)
+
+# weights for name, description, specialities
+_BM25 = "bm25(pages_fts, 10.0, 1.0, 4.0)"
+_fts = table("pages_fts", column("rowid"))
+_fts_ready = False
+
+
+def _specialities_text(specialities: Optional[str]) -> str:
+    # stored comma separated; index them as separate words
+    return (specialities or "").replace(",", " ")
+
+
+def _tsvector():
+    # literals instead of bound parameters, so the query expression is
+    # textually identical to the indexed one and Postgres can use the index
+    empty, space = literal_column("''"), literal_column("' '")
+    return func.to_tsvector(
+        literal_column("'simple'"),
+        func.coalesce(models.Page.name, empty)
+        .op("||")(space)
+        .op("||")(func.coalesce(models.Page.description, empty))
+        .op("||")(space)
+        .op("||")(
+            func.replace(
+                func.coalesce(models.Page.specialities, empty),
+                literal_column("','"),
+                space,
+            )
+        ),
+    )
+
+
+def _terms(q: str) -> list:
+    return re.findall(r"\w+", q.lower())
+
+
+async def ensure_search_index(conn: AsyncConnection):
+    """
+    Create the search index if it is missing (and backfill it on SQLite).
+    """
+    global _fts_ready
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        try:
+            await conn.execute(
+                text(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5("
+                    "name, description, specialities, "
+                    "tokenize = 'unicode61 remove_diacritics 2')"
+                )
+            )
+        except Exception:
+            logger.warning("SQLite has no FTS5; page search falls back to LIKE")
+            return
+        res = await conn.execute(text("SELECT count(*) FROM pages_fts"))
+        indexed = res.scalar()
+        if not indexed:
+            await conn.execute(
+                text(
+                    "INSERT INTO pages_fts(rowid, name, description, specialities) "
+                    "SELECT id, name, coalesce(description, ''), "
+                    "replace(coalesce(specialities, ''), ',', ' ') FROM pages"
+                )
+            )
+        _fts_ready = True
+    elif dialect == "postgresql":
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        tsvector = _tsvector().compile(dialect=conn.dialect)
+        await conn.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_pages_search_tsv "
+                f"ON pages USING gin ({tsvector})"
+            )
+        )
+        await conn.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_pages_name_trgm "
+                "ON pages USING gin (name gin_trgm_ops)"
+            )
+        )
+
+
+async def detect_search_index(conn: AsyncConnection):
+    """
+    Use an existing search index (e.g. created by migrations) without
+    creating or backfilling anything.
+    """
+    global _fts_ready
+    if conn.dialect.name == "sqlite":
+        res = await conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = 'pages_fts'")
+        )
+        _fts_ready = res.first() is not None
+
+
+async def index_page(db: AsyncSession, page: models.Page):
+    """
+    (Re)index one page after its fields changed. No-op outside SQLite FTS5.
+    """
+    if not _fts_ready or db.get_bind().dialect.name != "sqlite":
+        return
+    await db.execute(
+        text("DELETE FROM pages_fts WHERE rowid = :id"), {"id": page.id}
+    )
+    await db.execute(
+        text(
+            "INSERT INTO pages_fts(rowid, name, description, specialities) "
+            "VALUES (:id, :name, :description, :specialities)"
+        ),
+        {
+            "id": page.id,
+            "name": page.name,
+            "description": page.description or "",
+            "specialities": _specialities_text(page.specialities),
+        },
+    )
+
+
+async def index_pages(db: AsyncSession, page_ids: List[int]):
+    """
+    Index pages that were bulk-inserted (and so have no index rows yet) in
+    one statement. No-op outside SQLite FTS5.
+    """
+    if not page_ids or not _fts_ready or db.get_bind().dialect.name != "sqlite":
+        return
+    await db.execute(
+        text(
+            "INSERT INTO pages_fts(rowid, name, description, specialities) "
+            "SELECT id, name, coalesce(description, ''), "
+            "replace(coalesce(specialities, ''), ',', ' ') FROM pages "
+            "WHERE id IN :ids"
+        ).bindparams(bindparam("ids", expanding=True)),
+        {"ids": list(page_ids)},
+    )
+
+
+def apply_search(db: AsyncSession, stmt, q: str) -> Tuple[object, object]:
+    """
+    Restrict a select(Page) to pages matching `q` (every word must match,
+    as a prefix) and return (stmt, rank) where a higher rank is more relevant
+    (rank is None when the backend can't rank).
+    """
+    terms = _terms(q)
+    if not terms:
+        return stmt.where(false()), None
+
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite" and _fts_ready:
+        match = " ".join(f'"{t}"*' for t in terms)
+        hits = (
+            select(
+                _fts.c.rowid.label("page_id"),
+                literal_column(_BM25).label("score"),
+            )
+            .where(literal_column("pages_fts").op("MATCH")(match))
+            .subquery()
+        )
+        stmt = stmt.join(hits, hits.c.page_id == models.Page.id)
+        # bm25 is "lower is better"
+        return stmt, -hits.c.score
+
+    if dialect == "postgresql":
+        query = func.to_tsquery(
+            literal_column("'simple'"), " & ".join(f"{t}:*" for t in terms)
+        )
+        tsvector = _tsvector()
+        stmt = stmt.where(
+            or_(tsvector.op("@@")(query), models.Page.name.op("%")(q))
+        )
+        rank = func.ts_rank(tsvector, query) + cast(
+            func.similarity(models.Page.name, q), Float
+        )
+        return stmt, rank
+
+    # no index available: every word somewhere in the searchable columns
+    searchable = (
+        func.coalesce(models.Page.name, "")
+        + " "
+        + func.coalesce(models.Page.description, "")
+        + " "
+        + func.coalesce(models.Page.specialities, "")
+    )
+    stmt = stmt.where(and_(*(searchable.ilike(f"%{t}%") for t in terms)))
+    return stmt, literal_column("0")
@@ -0,0 +1,56 @@
+# app/singleflight.py
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Per-key call coalescing: while a call for a key is in flight, further
+    callers for the same key wait for its result instead of starting their own.
+
+    The call runs in its own task, so a caller that gets cancelled (e.g. the
+    client disconnects) neither cancels the shared call nor the other waiters.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self._waiters: Dict[Hashable, int] = {}
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._calls
+
+    def waiters(self, key: Hashable) -> int:
+        """
+        How many callers are waiting on the call for `key`.
+        """
+        return self._waiters.get(key, 0)
+
+    def cancel(self, key: Hashable) -> bool:
+        """
+        Cancel the call in flight for `key`, if any; callers that come after
+        start a new one. Its waiters get CancelledError, so only cancel a
+        call whose waiters are all giving up.
+        """
+        task = self._calls.pop(key, None)
+        if task is None:
+            return False
+        task.cancel()
+        return True
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
@@ -0,0 +1,299 @@
+# app/sync.py
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import crud, models
+from .cache import (
+    CachedPage,
+    get_cached_page_with_age,
+    set_cached_page,
+    touch_cached_page,
+)
+from .config import settings
+from .database import AsyncReadSessionLocal, AsyncSessionLocal
+from .scraper import scrape_linkedin_page
+from .singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+SyncStats = Dict[str, Dict[str, int]]
+
+# one in-flight sync / cache-miss load per page slug
+_syncs = SingleFlight()
+_loads = SingleFlight()
+# stale-while-revalidate refreshes currently scheduled, by page slug
+_background: Dict[str, asyncio.Task] = {}
+
+
+async def refresh_cache(
+    db: AsyncSession, page: models.Page, stats: SyncStats
+) -> CachedPage:
+    """
+    Bring the cached copy of a freshly synced page up to date and return it.
+    If neither the page nor its posts changed, the cache entry is only
+    marked fresh again instead of being rebuilt and re-encoded.
+    """
+    if crud.is_unchanged(stats, "page", "posts"):
+        entry = await get_cached_page_with_age(page.linkedin_page_id)
+        if entry:
+            await touch_cached_page(page.linkedin_page_id)
+            return entry[0]
+
+    data = await crud.build_page_data(db, page)
+    return await set_cached_page(page.linkedin_page_id, data)
+
+
+async def sync_one(db: AsyncSession, page_id: str) -> Tuple[CachedPage, SyncStats]:
+    """
+    Scrape a page, persist it and refresh its cache entry.
+    """
+    scraped = await scrape_linkedin_page(page_id)
+    page, stats = await crud.create_or_update_page_from_scrape(db, scraped)
+    data = await refresh_cache(db, page, stats)
+    return data, stats
+
+
+async def sync_page(page_id: str) -> Tuple[CachedPage, SyncStats]:
+    """
+    sync_one in its own session, coalesced per page: concurrent syncs of the
+    same slug share one scrape and one write.
+    """
+
+    async def run():
+        async with AsyncSessionLocal() as db:
+            return await sync_one(db, page_id)
+
+    return await _syncs.do(page_id, run)
+
+
+async def load_page(page_id: str) -> Tuple[CachedPage, float]:
+    """
+    Cache-miss path for page reads: DB first, scrape only if the page is
+    unknown. Returns the data and its age in seconds.
+    Coalesced per page, so N concurrent misses cost one lookup and at most
+    one scrape.
+    """
+
+    async def run():
+        # a load that finished just before we started may have filled it
+        entry = await get_cached_page_with_age(page_id)
+        if entry:
+            return entry
+        async with AsyncReadSessionLocal() as db:
+            page = await crud.get_page_by_slug(db, page_id)
+            if page:
+                data = await crud.build_page_data(db, page)
+                age = await crud.get_data_age(db, page)
+                return await set_cached_page(page_id, data, age=age), age
+        data, _ = await sync_page(page_id)
+        return data, 0.0
+
+    return await _loads.do(page_id, run)
+
+
+async def read_page(page_id: str) -> Tuple[CachedPage, float]:
+    """
+    Encoded page for GET /pages/{page_id} and its age in seconds.
+
+    Fresh data (younger than CACHE_TTL_SECONDS) is returned as-is. Stale
+    data is still returned immediately while a background re-scrape is
+    scheduled (stale-while-revalidate), unless it is older than
+    SWR_MAX_STALE_SECONDS, in which case the read waits for the re-scrape.
+    """
+    entry = await get_cached_page_with_age(page_id)
+    if entry is None:
+        entry = await load_page(page_id)
+    data, age = entry
+    if age < settings.CACHE_TTL_SECONDS:
+        return data, age
+    if settings.SWR_ENABLED and age < settings.SWR_MAX_STALE_SECONDS:
+        refresh_in_background(page_id)
+        return data, age
+    data, _ = await sync_page(page_id)
+    return data, 0.0
+
+
+async def warm_pages(page_ids: List[str], concurrency: int = 4) -> int:
+    """
+    Load pages from the DB into the cache (no scraping; unknown slugs are
+    skipped), `concurrency` at a time. Returns how many were cached.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def warm(page_id: str) -> bool:
+        async with semaphore:
+            async with AsyncReadSessionLocal() as db:
+                page = await crud.get_page_by_slug(db, page_id)
+                if page is None:
+                    return False
+                data = await crud.build_page_data(db, page)
+                age = await crud.get_data_age(db, page)
+            await set_cached_page(page_id, data, age=age)
+            return True
+
+    results = await asyncio.gather(
+        *(warm(pid) for pid in page_ids), return_exceptions=True
+    )
+    for page_id, result in zip(page_ids, results):
+        if isinstance(result, Exception):
+            logger.warning("warming %s failed: %r", page_id, result)
+    return sum(result is True for result in results)
+
+
+def refresh_in_background(page_id: str) -> bool:
+    """
+    Schedule a sync_page for `page_id` unless one is already scheduled or
+    running. Returns True if a new refresh was scheduled.
+    """
+    if page_id in _background or _syncs.in_flight(page_id):
+        return False
+
+    async def run():
+        try:
+            await sync_page(page_id)
+        except Exception:
+            logger.exception("background refresh of %s failed", page_id)
+        finally:
+            _background.pop(page_id, None)
+
+    _background[page_id] = asyncio.ensure_future(run())
+    return True
+
+
+# (page_id, scrape payload, resolved with (cached page, stats) once written)
+_Pending = Tuple[str, dict, "asyncio.Future[Tuple[CachedPage, SyncStats]]"]
+# batch writers still draining after their stream closed
+_writers: Set[asyncio.Task] = set()
+
+
+def _resolve(done: asyncio.Future, result: Any = None, error: Any = None):
+    if done.done():
+        return
+    if error is not None:
+        done.set_exception(error)
+    else:
+        done.set_result(result)
+
+
+async def _write_batch(batch: List[_Pending]):
+    """
+    Persist a batch of scrapes in one transaction and resolve each page's
+    future with its cached page and stats, or with its error.
+    If the batch fails, fall back to one transaction per page so a single bad
+    payload only fails its own page.
+    """
+    async with AsyncSessionLocal() as db:
+        try:
+            written = []
+            for _, payload, done in batch:
+                page, stats = await crud.create_or_update_page_from_scrape(
+                    db, payload, commit=False
+                )
+                written.append((page, stats, done))
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            written = None
+
+        if written is None:
+            written = []
+            for _, payload, done in batch:
+                try:
+                    page, stats = await crud.create_or_update_page_from_scrape(
+                        db, payload
+                    )
+                except Exception as exc:
+                    await db.rollback()
+                    _resolve(done, error=exc)
+                    continue
+                written.append((page, stats, done))
+
+        for page, stats, done in written:
+            try:
+                await db.refresh(page)
+                _resolve(done, (await refresh_cache(db, page, stats), stats))
+            except Exception as exc:
+                _resolve(done, error=exc)
+
+
+async def sync_pages(page_ids: List[str]) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Sync many pages, yielding one result per page as soon as it is written.
+
+    Scrapes run concurrently (at most settings.SYNC_CONCURRENCY at a time) and
+    feed a single writer, which commits whatever has finished scraping so far
+    in groups of up to settings.SYNC_WRITE_BATCH_SIZE pages. Each page goes
+    through the same per-slug coalescing as sync_page, so a batch and a
+    single-page sync of one page share a scrape and a write. A page that
+    fails yields an error result; the stream goes on.
+    """
+    writes: asyncio.Queue[Optional[_Pending]] = asyncio.Queue()
+    results: asyncio.Queue[Dict[str, Any]] = asyncio.Queue()
+    semaphore = asyncio.Semaphore(settings.SYNC_CONCURRENCY)
+    closed = False
+    # pages whose sync this batch is still waiting on
+    waiting: Set[str] = set()
+
+    async def run(pid: str) -> Tuple[CachedPage, SyncStats]:
+        async with semaphore:
+            payload = await scrape_linkedin_page(pid)
+        if closed:
+            # the stream is gone and its writer is winding down
+            async with AsyncSessionLocal() as db:
+                page, stats = await crud.create_or_update_page_from_scrape(
+                    db, payload
+                )
+                return await refresh_cache(db, page, stats), stats
+        done = asyncio.get_running_loop().create_future()
+        writes.put_nowait((pid, payload, done))
+        return await done
+
+    async def sync(pid: str):
+        waiting.add(pid)
+        try:
+            _, stats = await _syncs.do(pid, lambda: run(pid))
+        except Exception as exc:
+            error = str(exc) or repr(exc)
+            results.put_nowait({"page_id": pid, "status": "error", "error": error})
+        else:
+            results.put_nowait({"page_id": pid, "status": "ok", "sync": stats})
+        finally:
+            waiting.discard(pid)
+
+    async def writer():
+        while True:
+            batch = [await writes.get()]
+            while len(batch) < settings.SYNC_WRITE_BATCH_SIZE and not writes.empty():
+                batch.append(writes.get_nowait())
+            pending = [item for item in batch if item is not None]
+            try:
+                if pending:
+                    await _write_batch(pending)
+            except Exception as exc:
+                logger.exception("batch sync write failed")
+                for _, _, done in pending:
+                    _resolve(done, error=exc)
+            if len(pending) < len(batch):
+                return
+
+    writer_task = asyncio.create_task(writer())
+    _writers.add(writer_task)
+    writer_task.add_done_callback(_writers.discard)
+    unique = list(dict.fromkeys(page_ids))
+    tasks = [asyncio.create_task(sync(pid)) for pid in unique]
+    try:
+        for _ in unique:
+            yield await results.get()
+    finally:
+        # client went away mid-stream (or we're done): let the writer finish
+        # what is queued and stop the scrapes nobody else waits on, queued
+        # ones included. A scrape another sync of the page also waits on
+        # carries on and writes its page itself.
+        closed = True
+        writes.put_nowait(None)
+        for task in tasks:
+            task.cancel()
+        for pid in waiting:
+            if _syncs.waiters(pid) == 1:
+                _syncs.cancel(pid)
@@ -0,0 +1,68 @@
+# migrations/env.py
+import asyncio
+from logging.config import fileConfig
+from alembic import context
+from sqlalchemy.ext.asyncio import create_async_engine
+from app import models  # noqa: F401  (registers the tables on Base.metadata)
+from app.config import settings
+from app.database import Base
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+# the search index is raw DDL (app/search.py), not part of Base.metadata:
+# without this, autogenerate would drop it
+_SEARCH_INDEXES = {"ix_pages_search_tsv", "ix_pages_name_trgm"}
+
+
+def include_name(name, type_, parent_names) -> bool:
+    if type_ == "table":
+        # SQLite's FTS5 table and its shadow tables
+        return not name.startswith("pages_fts")
+    if type_ == "index":
+        return name not in _SEARCH_INDEXES
+    return True
+
+
+def _url() -> str:
+    return config.get_main_option("sqlalchemy.url") or settings.DATABASE_URL
+
+
+def run_migrations_offline():
+    context.configure(
+        url=_url(),
+        target_metadata=target_metadata,
+        include_name=include_name,
+        literal_binds=True,
+        render_as_batch=_url().startswith("sqlite"),
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def do_run_migrations(connection):
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_name=include_name,
+        # SQLite can't ALTER most things in place
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+async def run_migrations_online():
+    engine = create_async_engine(_url())
+    async with engine.connect() as connection:
+        await connection.run_sync(do_run_migrations)
+    await engine.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    asyncio.run(run_migrations_online())
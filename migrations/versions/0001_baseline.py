@@ -0,0 +1,161 @@
+"""baseline: pages, posts, users, employments, comments, followers
+
+Databases created by init_db() before migrations existed already have these
+tables; they are left alone, so `alembic upgrade head` works on them too.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name: str) -> bool:
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade():
+    if not _has_table("pages"):
+        op.create_table(
+            "pages",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("linkedin_page_id", sa.String(255), nullable=False),
+            sa.Column("linkedin_platform_id", sa.String(255), nullable=True),
+            sa.Column("name", sa.String(255), nullable=False),
+            sa.Column("url", sa.String(512), nullable=False),
+            sa.Column("profile_image_url", sa.String(512), nullable=True),
+            sa.Column("description", sa.Text(), nullable=True),
+            sa.Column("website", sa.String(512), nullable=True),
+            sa.Column("industry", sa.String(255), nullable=True),
+            sa.Column("follower_count", sa.Integer(), nullable=True),
+            sa.Column("headcount", sa.Integer(), nullable=True),
+            sa.Column("specialities", sa.Text(), nullable=True),
+            sa.Column(
+                "created_at", sa.DateTime(timezone=True), server_default=sa.func.now()
+            ),
+            sa.Column(
+                "updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()
+            ),
+        )
+        op.create_index("ix_pages_id", "pages", ["id"])
+        op.create_index(
+            "ix_pages_linkedin_page_id", "pages", ["linkedin_page_id"], unique=True
+        )
+
+    if not _has_table("posts"):
+        op.create_table(
+            "posts",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column(
+                "page_id",
+                sa.Integer(),
+                sa.ForeignKey("pages.id", ondelete="CASCADE"),
+                nullable=False,
+            ),
+            sa.Column("linkedin_post_id", sa.String(255), nullable=False),
+            sa.Column("content_text", sa.Text(), nullable=True),
+            sa.Column("media_url", sa.String(512), nullable=True),
+            sa.Column("like_count", sa.Integer(), nullable=True),
+            sa.Column("comment_count", sa.Integer(), nullable=True),
+            sa.Column("share_count", sa.Integer(), nullable=True),
+            sa.Column("posted_at", sa.DateTime(timezone=True), nullable=True),
+        )
+        op.create_index("ix_posts_id", "posts", ["id"])
+        op.create_index("ix_posts_linkedin_post_id", "posts", ["linkedin_post_id"])
+
+    if not _has_table("social_media_users"):
+        op.create_table(
+            "social_media_users",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("linkedin_user_id", sa.String(255), nullable=False),
+            sa.Column("name", sa.String(255), nullable=False),
+            sa.Column("headline", sa.String(512), nullable=True),
+            sa.Column("profile_url", sa.String(512), nullable=True),
+            sa.Column("profile_image_url", sa.String(512), nullable=True),
+        )
+        op.create_index("ix_social_media_users_id", "social_media_users", ["id"])
+        op.create_index(
+            "ix_social_media_users_linkedin_user_id",
+            "social_media_users",
+            ["linkedin_user_id"],
+            unique=True,
+        )
+
+    if not _has_table("employments"):
+        op.create_table(
+            "employments",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column(
+                "user_id",
+                sa.Integer(),
+                sa.ForeignKey("social_media_users.id", ondelete="CASCADE"),
+                nullable=False,
+            ),
+            sa.Column(
+                "page_id",
+                sa.Integer(),
+                sa.ForeignKey("pages.id", ondelete="CASCADE"),
+                nullable=False,
+            ),
+            sa.Column("title", sa.String(255), nullable=True),
+            sa.Column("location", sa.String(255), nullable=True),
+        )
+        op.create_index("ix_employments_id", "employments", ["id"])
+
+    if not _has_table("comments"):
+        op.create_table(
+            "comments",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column(
+                "post_id",
+                sa.Integer(),
+                sa.ForeignKey("posts.id", ondelete="CASCADE"),
+                nullable=False,
+            ),
+            sa.Column(
+                "user_id",
+                sa.Integer(),
+                sa.ForeignKey("social_media_users.id", ondelete="CASCADE"),
+                nullable=False,
+            ),
+            sa.Column("content_text", sa.Text(), nullable=True),
+            sa.Column("like_count", sa.Integer(), nullable=True),
+        )
+        op.create_index("ix_comments_id", "comments", ["id"])
+
+    if not _has_table("page_followers"):
+        op.create_table(
+            "page_followers",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column(
+                "page_id",
+                sa.Integer(),
+                sa.ForeignKey("pages.id", ondelete="CASCADE"),
+                nullable=False,
+            ),
+            sa.Column(
+                "user_id",
+                sa.Integer(),
+                sa.ForeignKey("social_media_users.id", ondelete="CASCADE"),
+                nullable=False,
+            ),
+        )
+        op.create_index("ix_page_followers_id", "page_followers", ["id"])
+
+
+def downgrade():
+    for table in (
+        "page_followers",
+        "comments",
+        "employments",
+        "social_media_users",
+        "posts",
+        "pages",
+    ):
+        op.drop_table(table)
@@ -0,0 +1,101 @@
+"""page fingerprints, sync jobs and the page search index
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name: str) -> bool:
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade():
+    if not _has_table("page_fingerprints"):
+        op.create_table(
+            "page_fingerprints",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column(
+                "page_id",
+                sa.Integer(),
+                sa.ForeignKey("pages.id", ondelete="CASCADE"),
+                nullable=False,
+            ),
+            sa.Column("section", sa.String(32), nullable=False),
+            sa.Column("content_hash", sa.String(64), nullable=False),
+            sa.Column(
+                "changed_at", sa.DateTime(timezone=True), server_default=sa.func.now()
+            ),
+            sa.Column(
+                "checked_at", sa.DateTime(timezone=True), server_default=sa.func.now()
+            ),
+            sa.UniqueConstraint("page_id", "section"),
+        )
+        op.create_index("ix_page_fingerprints_id", "page_fingerprints", ["id"])
+
+    if not _has_table("sync_jobs"):
+        op.create_table(
+            "sync_jobs",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("linkedin_page_id", sa.String(255), nullable=False),
+            sa.Column("status", sa.String(16), nullable=False),
+            sa.Column("attempts", sa.Integer(), nullable=False),
+            sa.Column("worker_id", sa.String(64), nullable=True),
+            sa.Column("error", sa.Text(), nullable=True),
+            sa.Column("result", sa.Text(), nullable=True),
+            sa.Column(
+                "created_at", sa.DateTime(timezone=True), server_default=sa.func.now()
+            ),
+            sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+        )
+        op.create_index("ix_sync_jobs_id", "sync_jobs", ["id"])
+        op.create_index(
+            "ix_sync_jobs_linkedin_page_id", "sync_jobs", ["linkedin_page_id"]
+        )
+        op.create_index("ix_sync_jobs_status", "sync_jobs", ["status"])
+
+    # same DDL as app.search.ensure_search_index, which init_db also runs
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5("
+            "name, description, specialities, "
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        op.execute("DELETE FROM pages_fts")
+        op.execute(
+            "INSERT INTO pages_fts(rowid, name, description, specialities) "
+            "SELECT id, name, coalesce(description, ''), "
+            "replace(coalesce(specialities, ''), ',', ' ') FROM pages"
+        )
+    elif dialect == "postgresql":
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute(
+            "CREATE INDEX IF NOT EXISTS ix_pages_search_tsv ON pages USING gin "
+            "(to_tsvector('simple', (((coalesce(pages.name, '') || ' ') || "
+            "coalesce(pages.description, '')) || ' ') || "
+            "replace(coalesce(pages.specialities, ''), ',', ' ')))"
+        )
+        op.execute(
+            "CREATE INDEX IF NOT EXISTS ix_pages_name_trgm "
+            "ON pages USING gin (name gin_trgm_ops)"
+        )
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        op.execute("DROP TABLE IF EXISTS pages_fts")
+    elif dialect == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_pages_name_trgm")
+        op.execute("DROP INDEX IF EXISTS ix_pages_search_tsv")
+    op.drop_table("sync_jobs")
+    op.drop_table("page_fingerprints")
@@ -0,0 +1,67 @@
+"""indexes for the hot read paths
+
+- posts (page_id, posted_at DESC): a page's newest posts
+- page_followers (page_id, user_id) UNIQUE: follower lists and sync diffs;
+  duplicate follow rows are removed first (the oldest row is kept)
+- pages (industry), (name, id), (follower_count, id): GET /pages filters and
+  keyset sorts
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def _has_index(table: str, name: str) -> bool:
+    indexes = sa.inspect(op.get_bind()).get_indexes(table)
+    return any(index["name"] == name for index in indexes)
+
+
+def upgrade():
+    postgres = op.get_bind().dialect.name == "postgresql"
+
+    op.execute(
+        "DELETE FROM page_followers WHERE id NOT IN ("
+        "SELECT min(id) FROM page_followers GROUP BY page_id, user_id)"
+    )
+    if not _has_index("page_followers", "ux_page_followers_page_id_user_id"):
+        op.create_index(
+            "ux_page_followers_page_id_user_id",
+            "page_followers",
+            ["page_id", "user_id"],
+            unique=True,
+        )
+
+    if not _has_index("posts", "ix_posts_page_id_posted_at"):
+        posted_at = "posted_at DESC NULLS LAST" if postgres else "posted_at DESC"
+        op.create_index(
+            "ix_posts_page_id_posted_at",
+            "posts",
+            ["page_id", sa.text(posted_at)],
+        )
+
+    if not _has_index("pages", "ix_pages_industry"):
+        op.create_index("ix_pages_industry", "pages", ["industry"])
+    if not _has_index("pages", "ix_pages_name_id"):
+        op.create_index("ix_pages_name_id", "pages", ["name", "id"])
+    if not _has_index("pages", "ix_pages_follower_count_id"):
+        if postgres:
+            columns = [sa.text("follower_count DESC NULLS LAST"), sa.text("id DESC")]
+        else:
+            columns = ["follower_count", "id"]
+        op.create_index("ix_pages_follower_count_id", "pages", columns)
+
+
+def downgrade():
+    op.drop_index("ix_pages_follower_count_id", table_name="pages")
+    op.drop_index("ix_pages_name_id", table_name="pages")
+    op.drop_index("ix_pages_industry", table_name="pages")
+    op.drop_index("ix_posts_page_id_posted_at", table_name="posts")
+    op.drop_index("ux_page_followers_page_id_user_id", table_name="page_followers")
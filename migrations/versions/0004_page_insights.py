@@ -0,0 +1,61 @@
+"""page_insights: precomputed engagement aggregates per page
+
+Existing pages get their row on their next sync, on the first
+GET /pages/{page_id}/insights, or all at once with `python -m app.insights`.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table("page_insights"):
+        return
+    op.create_table(
+        "page_insights",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "page_id",
+            sa.Integer(),
+            sa.ForeignKey("pages.id", ondelete="CASCADE"),
+            nullable=False,
+            unique=True,
+        ),
+        sa.Column("post_count", sa.Integer(), nullable=False),
+        sa.Column("total_likes", sa.BigInteger(), nullable=False),
+        sa.Column("total_comments", sa.BigInteger(), nullable=False),
+        sa.Column("total_shares", sa.BigInteger(), nullable=False),
+        sa.Column("total_engagement", sa.BigInteger(), nullable=False),
+        sa.Column("avg_likes", sa.Float(), nullable=True),
+        sa.Column("avg_comments", sa.Float(), nullable=True),
+        sa.Column("avg_shares", sa.Float(), nullable=True),
+        sa.Column("avg_engagement", sa.Float(), nullable=True),
+        sa.Column("engagement_rate", sa.Float(), nullable=True),
+        sa.Column("posts_per_week", sa.Float(), nullable=True),
+        sa.Column("first_post_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_post_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("top_posts", sa.Text(), nullable=True),
+        sa.Column(
+            "computed_at", sa.DateTime(timezone=True), server_default=sa.func.now()
+        ),
+    )
+    op.create_index("ix_page_insights_id", "page_insights", ["id"])
+    for column in (
+        "total_engagement",
+        "avg_engagement",
+        "engagement_rate",
+        "posts_per_week",
+    ):
+        op.create_index(f"ix_page_insights_{column}", "page_insights", [column])
+
+
+def downgrade():
+    op.drop_table("page_insights")
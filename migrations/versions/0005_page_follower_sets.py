@@ -0,0 +1,42 @@
+"""page_follower_sets: per-page sorted follower id arrays for audience overlap
+
+Existing pages get their set on their next followers sync, on first use by
+the audience endpoints, or all at once with `python -m app.audience`.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table("page_follower_sets"):
+        return
+    op.create_table(
+        "page_follower_sets",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "page_id",
+            sa.Integer(),
+            sa.ForeignKey("pages.id", ondelete="CASCADE"),
+            nullable=False,
+            unique=True,
+        ),
+        sa.Column("follower_count", sa.Integer(), nullable=False),
+        sa.Column("user_ids", sa.LargeBinary(), nullable=False),
+        sa.Column(
+            "updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()
+        ),
+    )
+    op.create_index("ix_page_follower_sets_id", "page_follower_sets", ["id"])
+
+
+def downgrade():
+    op.drop_table("page_follower_sets")
@@ -0,0 +1,33 @@
+"""index page_fingerprints (section, checked_at): the scheduler's stalest scan
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def _has_index(table: str, name: str) -> bool:
+    indexes = sa.inspect(op.get_bind()).get_indexes(table)
+    return any(index["name"] == name for index in indexes)
+
+
+def upgrade():
+    if not _has_index("page_fingerprints", "ix_page_fingerprints_section_checked_at"):
+        op.create_index(
+            "ix_page_fingerprints_section_checked_at",
+            "page_fingerprints",
+            ["section", "checked_at"],
+        )
+
+
+def downgrade():
+    op.drop_index(
+        "ix_page_fingerprints_section_checked_at", table_name="page_fingerprints"
+    )
@@ -1,12 +1,51 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session, selectinload
 from .models import Page, Post, Comment, Employee
 
+# everything PageOut serializes, loaded up front: one query per relationship
+# level instead of one per page / post
+PAGE_DETAILS = (
+    selectinload(Page.posts).selectinload(Post.comments),
+    selectinload(Page.employees),
+)
+
 
 def get_page_by_page_id(db: Session, page_id: str):
-    return db.query(Page).filter(Page.page_id == page_id).first()
+    return (
+        db.query(Page)
+        .options(*PAGE_DETAILS)
+        .filter(Page.page_id == page_id)
+        .first()
+    )
+
+
+def filter_pages(
+    db: Session,
+    industry: str | None,
+    min_followers: int,
+    max_followers: int,
+    offset: int,
+    limit: int,
+):
+    q = db.query(Page).filter(Page.followers.between(min_followers, max_followers))
+    if industry:
+        q = q.filter(Page.industry.ilike(f"%{industry}%"))
+    return (
+        q.options(*PAGE_DETAILS)
+        .order_by(Page.id)
+        .offset(offset)
+        .limit(limit)
+        .all()
+    )
 
 
 def create_page(db: Session, data: dict):
+    """
+    Insert a scraped page with its posts, comments and employees in one
+    transaction, one multi-row INSERT per table. (Adding the object graph
+    would insert row by row: the ORM needs each post's id for its comments,
+    and MySQL can't return ids from a multi-row INSERT.)
+    """
     page = Page(
         page_id=data["page_id"],
         name=data["name"],
@@ -16,27 +55,34 @@ def create_page(db: Session, data: dict):
         followers=data["followers"],
         headcount=data["headcount"]
     )
-
     db.add(page)
-    db.commit()
-    db.refresh(page)
-
-    for post_data in data["posts"]:
-        post = Post(content=post_data["content"], page=page)
-        db.add(post)
-        db.commit()
-
-        for c in post_data["comments"]:
-            comment = Comment(text=c["text"], post=post)
-            db.add(comment)
-
-    for emp in data["employees"]:
-        employee = Employee(
-            name=emp["name"],
-            role=emp["role"],
-            page=page
+    db.flush()
+
+    posts = data["posts"]
+    if posts:
+        db.execute(
+            insert(Post),
+            [{"page_id": page.id, "content": p["content"]} for p in posts],
         )
-        db.add(employee)
+        # the page is new, so these are exactly the rows just inserted, in order
+        post_ids = db.scalars(
+            select(Post.id).where(Post.page_id == page.id).order_by(Post.id)
+        ).all()
+        comments = [
+            {"post_id": post_id, "text": c["text"]}
+            for post_id, post_data in zip(post_ids, posts)
+            for c in post_data["comments"]
+        ]
+        if comments:
+            db.execute(insert(Comment), comments)
+
+    employees = [
+        {"page_id": page.id, "name": emp["name"], "role": emp["role"]}
+        for emp in data["employees"]
+    ]
+    if employees:
+        db.execute(insert(Employee), employees)
 
     db.commit()
-    return page
+    # the commit expired everything; reload it eagerly for the response
+    return get_page_by_page_id(db, data["page_id"])
@@ -1,9 +1,16 @@
+import os
 from fastapi import FastAPI
 from app.database import Base, engine
 from app.routers.pages import router as pages_router
 
-Base.metadata.create_all(bind=engine)
-
 app = FastAPI(title="LinkedIn Insights Microservice")
 
 app.include_router(pages_router)
+
+
+@app.on_event("startup")
+def create_tables():
+    # on startup rather than at import; CREATE_SCHEMA=false skips it when the
+    # tables are managed elsewhere
+    if os.getenv("CREATE_SCHEMA", "true").lower() != "false":
+        Base.metadata.create_all(bind=engine)
@@ -0,0 +1,90 @@
+"""
+N+1 guard: run each endpoint against a scratch in-memory SQLite database
+and fail if it issues more SQL statements than its budget.
+
+    python -m app.querycount
+
+The counts must not grow with the number of pages, posts or comments, so
+the pages used here have as many posts and comments as the scraper returns
+and the list call asks for several pages.
+"""
+import os
+import sys
+
+# never touch the configured database (load_dotenv won't override this)
+os.environ["DATABASE_URL"] = "sqlite://"
+
+from sqlalchemy import create_engine, event  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from app.database import Base  # noqa: E402
+from app.routers.pages import filter_pages, get_page  # noqa: E402
+from app.schemas import PageOut  # noqa: E402
+
+# statements per call, whatever the amount of data
+BUDGETS = {
+    "GET /pages/{page_id} (stored)": 4,
+    "GET /pages/{page_id} (scrape + insert)": 10,
+    "GET /pages/?limit=10": 4,
+}
+
+
+def _serialize(result):
+    # what FastAPI does with response_model, lazy loads included
+    many = isinstance(result, list)
+    items = result if many else [result]
+    if hasattr(PageOut, "model_validate"):  # pydantic 2
+        out = [PageOut.model_validate(item, from_attributes=True) for item in items]
+    else:
+        out = [PageOut.from_orm(item) for item in items]
+    return out if many else out[0]
+
+
+def main() -> int:
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    statements = []
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda conn, cursor, sql, *args: statements.append(sql),
+    )
+
+    def count(call) -> int:
+        with Session() as db:
+            statements.clear()
+            _serialize(call(db))
+            return len(statements)
+
+    for i in range(12):
+        with Session() as db:
+            get_page(f"seed{i}", db=db)
+
+    counts = {
+        "GET /pages/{page_id} (stored)": count(lambda db: get_page("seed0", db=db)),
+        "GET /pages/{page_id} (scrape + insert)": count(
+            lambda db: get_page("fresh", db=db)
+        ),
+        "GET /pages/?limit=10": count(
+            lambda db: filter_pages(
+                industry=None,
+                min_followers=0,
+                max_followers=1_000_000,
+                page=1,
+                limit=10,
+                db=db,
+            )
+        ),
+    }
+
+    failed = 0
+    for label, n in counts.items():
+        budget = BUDGETS[label]
+        status = "ok" if n <= budget else "OVER BUDGET"
+        print(f"{label}: {n} statements (budget {budget}) {status}")
+        failed += n > budget
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,9 @@
 from fastapi import APIRouter, Depends
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from app.database import SessionLocal
 from app.schemas import PageOut
 from app import crud, scraper
-from app.models import Page
 from app.utils import paginate
 
 router = APIRouter(prefix="/pages", tags=["Pages"])
@@ -22,7 +22,12 @@ def get_page(page_id: str, db: Session = Depends(get_db)):
     page = crud.get_page_by_page_id(db, page_id)
     if not page:
         data = scraper.scrape_linkedin_page(page_id)
-        page = crud.create_page(db, data)
+        try:
+            page = crud.create_page(db, data)
+        except IntegrityError:
+            # a concurrent request stored it first
+            db.rollback()
+            page = crud.get_page_by_page_id(db, page_id)
     return page
 
 
@@ -35,12 +40,7 @@ def filter_pages(
     limit: int = 10,
     db: Session = Depends(get_db)
 ):
-    q = db.query(Page).filter(
-        Page.followers.between(min_followers, max_followers)
-    )
-
-    if industry:
-        q = q.filter(Page.industry.ilike(f"%{industry}%"))
-
     offset, limit = paginate(page, limit)
-    return q.offset(offset).limit(limit).all()
+    return crud.filter_pages(
+        db, industry, min_followers, max_followers, offset, limit
+    )